@@ -1,8 +1,19 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, load_only
 from app.api import deps
 from app.models import all_models
+from app.db.migrations import MIGRATIONS
+from app.db.session import pool_stats
+from app.services.ai_service import gemini_breaker
+from app.services.audio_cache import audio_cache
+from app.services.chat_cache import chat_cache
+from app.services.catalog_service import catalog_service
+from app.services.place_translation_service import place_translation_service
+from app.services.prerender_service import prerender_service
+from app.services.translation_service import translation_service
+from app.services.tts_scheduler import tts_scheduler
+from app.services.welcome_service import welcome_service
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -41,6 +52,25 @@ class PlaceResponse(PlaceBase):
     class Config:
         from_attributes = True
 
+class PlaceSummaryResponse(BaseModel):
+    id: int
+    name: str
+    latitude: float
+    longitude: float
+    is_active: bool = True
+    type: str
+    photo_url: str | None = None
+    parent_id: Optional[int] = None
+    class Config:
+        from_attributes = True
+
+def place_columns(schema) -> list:
+    """
+    Place columns a response schema needs, for load_only: everything else
+    (story_text, child_text, history, ...) is never read from the database.
+    """
+    return [getattr(all_models.Place, name) for name in schema.model_fields]
+
 class HotelBase(BaseModel):
     name: str
     contact_info: str | None = None
@@ -116,7 +146,7 @@ class StatsResponse(BaseModel):
 
 @router.get("/dashboard", response_model=StatsResponse)
 def get_dashboard_stats(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: all_models.User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     return {
@@ -129,21 +159,104 @@ def get_dashboard_stats(
         }
     }
 
+@router.get("/audio-cache")
+def get_audio_cache_stats(current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return audio_cache.stats()
+
+@router.get("/tts-scheduler")
+def get_tts_scheduler_stats(current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return tts_scheduler.stats()
+
+@router.get("/welcome-messages")
+def get_welcome_cache_stats(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return {**welcome_service.stats(), "stored": db.query(all_models.WelcomeMessage).count()}
+
+@router.delete("/welcome-messages")
+def purge_welcome_messages(place_id: Optional[int] = None, db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
+    names = None
+    if place_id is not None:
+        place = db.query(all_models.Place).filter(all_models.Place.id == place_id).first()
+        if not place: raise HTTPException(status_code=404, detail="Place not found")
+        names = [place.name]
+    deleted = welcome_service.invalidate(db, names)
+    if place_id is not None:
+        prerender_service.enqueue_place(place_id)
+    else:
+        prerender_service.enqueue_all()
+    return {"deleted": deleted}
+
+@router.get("/chat-cache")
+def get_chat_cache(
+    context: Optional[str] = None,
+    lang: Optional[str] = None,
+    limit: int = 100,
+    current_user: all_models.User = Depends(deps.get_current_active_superuser)
+) -> Any:
+    return {**chat_cache.stats(), "items": chat_cache.entries(context, lang, limit)}
+
+@router.delete("/chat-cache")
+def purge_chat_cache(
+    context: Optional[str] = None,
+    lang: Optional[str] = None,
+    query: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: all_models.User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Purges matching entries; the other workers apply the same purge within
+    PURGE_CHECK_SECONDS. `deleted` counts this worker's entries only.
+    """
+    return {"deleted": chat_cache.record_purge(db, context, lang, query)}
+
+@router.get("/translations")
+def get_translation_cache_stats(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return {
+        **translation_service.stats(),
+        "stored": db.query(all_models.Translation).count(),
+        "places": {**place_translation_service.stats(), "stored": db.query(all_models.PlaceTranslation).count()},
+    }
+
+@router.get("/db-pool")
+def get_db_pool_stats(current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return pool_stats()
+
+@router.get("/migrations")
+def get_migrations(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    applied = {row.version: row for row in db.query(all_models.SchemaMigration)}
+    return [
+        {
+            "version": migration.version,
+            "description": migration.description,
+            "applied_at": applied[migration.version].applied_at if migration.version in applied else None,
+        }
+        for migration in MIGRATIONS
+    ]
+
+@router.get("/gemini")
+def get_gemini_status(current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return gemini_breaker.stats()
+
+@router.get("/prerender")
+def get_prerender_status(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)) -> Any:
+    return prerender_service.stats()
+
 # --- Places ---
-@router.get("/places", response_model=List[PlaceResponse])
+@router.get("/places", response_model=Union[List[PlaceSummaryResponse], List[PlaceResponse]])
 def read_places(
     skip: int = 0, 
     limit: int = 100, 
     include_children: bool = False,
-    db: Session = Depends(deps.get_db), 
+    view: str = Query("full", pattern="^(summary|full)$", description="'summary' omits texts and boundary polygons"),
+    db: Session = Depends(deps.get_read_db), 
     current_user: all_models.User = Depends(deps.get_current_active_superuser)
 ):
-    query = db.query(all_models.Place)
+    schema = PlaceSummaryResponse if view == "summary" else PlaceResponse
+    query = db.query(all_models.Place).options(load_only(*place_columns(schema)))
     
     if not include_children:
         query = query.filter(all_models.Place.parent_id == None)
         
-    return query.offset(skip).limit(limit).all()
+    return [schema.model_validate(place) for place in query.offset(skip).limit(limit)]
 
 @router.post("/places", response_model=PlaceResponse)
 def create_place(place_in: PlaceCreate, db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
@@ -151,31 +264,42 @@ def create_place(place_in: PlaceCreate, db: Session = Depends(deps.get_db), curr
     db.add(place)
     db.commit()
     db.refresh(place)
+    catalog_service.publish_change(db)
+    prerender_service.enqueue_place(place.id)
     return place
 
 @router.put("/places/{place_id}", response_model=PlaceResponse)
 def update_place(place_id: int, place_in: PlaceUpdate, db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     place = db.query(all_models.Place).filter(all_models.Place.id == place_id).first()
     if not place: raise HTTPException(status_code=404, detail="Place not found")
+    old_name = place.name
     for k, v in place_in.dict(exclude_unset=True).items(): setattr(place, k, v)
     db.add(place)
     db.commit()
     db.refresh(place)
+    catalog_service.publish_change(db)
+    welcome_service.invalidate(db, {old_name, place.name})
+    prerender_service.enqueue_place(place.id)
     return place
 
 @router.delete("/places/{place_id}")
 def delete_place(place_id: int, db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     # Cascade delete: Delete children first
+    child_ids = [row.id for row in db.query(all_models.Place.id).filter(all_models.Place.parent_id == place_id)]
+    names = [row.name for row in db.query(all_models.Place.name).filter(all_models.Place.id.in_(child_ids + [place_id]))]
+    db.query(all_models.WelcomeMessage).filter(all_models.WelcomeMessage.place_name.in_(names)).delete(synchronize_session=False)
+    db.query(all_models.PlaceTranslation).filter(all_models.PlaceTranslation.place_id.in_(child_ids + [place_id])).delete(synchronize_session=False)
     db.query(all_models.Place).filter(all_models.Place.parent_id == place_id).delete()
     
     # Then delete the place itself
     db.query(all_models.Place).filter(all_models.Place.id == place_id).delete()
     db.commit()
+    catalog_service.publish_change(db)
     return {"status": "success"}
 
 # --- Hotels ---
 @router.get("/hotels", response_model=List[HotelResponse])
-def read_hotels(db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
+def read_hotels(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     return db.query(all_models.Hotel).all()
 
 @router.post("/hotels", response_model=HotelResponse)
@@ -204,7 +328,7 @@ def delete_hotel(id: int, db: Session = Depends(deps.get_db), current_user: all_
 
 # --- Restaurants ---
 @router.get("/restaurants", response_model=List[RestaurantResponse])
-def read_restaurants(db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
+def read_restaurants(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     return db.query(all_models.Restaurant).all()
 
 @router.post("/restaurants", response_model=RestaurantResponse)
@@ -233,7 +357,7 @@ def delete_restaurant(id: int, db: Session = Depends(deps.get_db), current_user:
 
 # --- Shops ---
 @router.get("/shops", response_model=List[ShopResponse])
-def read_shops(db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
+def read_shops(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     return db.query(all_models.Shop).all()
 
 @router.post("/shops", response_model=ShopResponse)
@@ -262,7 +386,7 @@ def delete_shop(id: int, db: Session = Depends(deps.get_db), current_user: all_m
 
 # --- Settings ---
 @router.get("/config", response_model=List[ConfigResponse])
-def read_config(db: Session = Depends(deps.get_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
+def read_config(db: Session = Depends(deps.get_read_db), current_user: all_models.User = Depends(deps.get_current_active_superuser)):
     return db.query(all_models.GlobalConfig).all()
 
 @router.put("/config", response_model=ConfigResponse)
@@ -1,13 +1,78 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, get_async_db
+from app.models import all_models
 from app.services.ai_service import ai_service
+from app.services.catalog_service import catalog_service
+from app.services.chat_cache import chat_cache
+from app.services.geo_service import geo_service, THRESHOLD_METERS
+from app.services.place_translation_service import place_translation_service
+from app.services.prerender_service import intro_fallback, narration_text
+from app.services.proximity_service import ProximitySession
+from app.services.retrieval_service import retrieval_service
+from app.services.welcome_service import welcome_service
+from app.services.translation_service import translation_service
+from app.services.tts_scheduler import TTSQueueFullError, PRIORITY_INTRO, PRIORITY_SHORT, PRIORITY_LONG
 from app.schemas import schemas
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple, TypeVar, Union
+import asyncio
+import logging
 from app.api.endpoints import login, admin
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How often a long-running upstream call checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Awaits an upstream call, cancelling it if the client goes away first.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def stream_audio_response(chunks: AsyncIterator[bytes], headers: Optional[dict] = None) -> StreamingResponse:
+    """
+    Wraps a chunk generator in an audio/mpeg StreamingResponse. The first chunk
+    is awaited up front so synthesis failures still surface as a 500.
+    """
+    try:
+        first_chunk = await chunks.__anext__()
+    except TTSQueueFullError:
+        raise # Answered with 503 + Retry-After by the app's exception handler
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="Audio generation failed")
+    except Exception:
+        logger.exception("Audio stream failed before the first chunk")
+        raise HTTPException(status_code=500, detail="Audio generation failed")
+
+    async def body():
+        yield first_chunk
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception:
+            # Headers are already sent, all we can do is end the stream early
+            logger.exception("Audio stream ended early")
+
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
 
 @router.post("/identify-place", response_model=schemas.IdentificationResponse)
 async def identify_place(file: UploadFile = File(...)):
@@ -25,94 +90,161 @@ async def analyze_product(file: UploadFile = File(...)):
 
 
 @router.get("/places/by-location", response_model=schemas.Place)
-async def get_place_by_location(lat: float, lng: float, db: Session = Depends(get_db)):
-    from app.models import all_models
-    import math
-
-    # Haversine formula to find closest place
-    def haversine(lat1, lon1, lat2, lon2):
-        R = 6371 * 1000  # radius of Earth in meters
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lon2 - lon1)
-        a = math.sin(delta_phi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
-
-    places = db.query(all_models.Place).filter(all_models.Place.is_active == True).all()
-    
-    closest_place = None
-    min_dist = float('inf')
-    
-    # Threshold in meters (e.g. 100 meters)
-    THRESHOLD_METERS = 300
+async def get_place_by_location(lat: float, lng: float, db: AsyncSession = Depends(get_async_db)):
+    # Deepest geofence containing the fix, else the closest place from the spatial index
+    catalog = await catalog_service.get_async(db)
+    closest, min_dist = geo_service.locate(catalog.geo, lat, lng)
 
-    for place in places:
-        try:
-            # Skip if place has no valid coordinates
-            if place.latitude is None or place.longitude is None:
-                continue
-                
-            dist = haversine(lat, lng, place.latitude, place.longitude)
-            
-            if dist < min_dist:
-                min_dist = dist
-                closest_place = place
-        except Exception as e:
-            print(f"Error calculating distance for {place.name}: {e}")
-            continue
-
-    if closest_place and min_dist <= THRESHOLD_METERS:
-        # Map fields
-        closest_place.location_lat = closest_place.latitude
-        closest_place.location_lng = closest_place.longitude
-        if not closest_place.description: closest_place.description = closest_place.short_desc
-        return closest_place
+    if closest and min_dist <= THRESHOLD_METERS:
+        closest_place = catalog.places.get(closest.id)
+        if closest_place:
+            return closest_place
     
     debug_msg = f"No place found near this location."
-    if closest_place:
-        debug_msg += f" Closest: '{closest_place.name}' at {int(min_dist)}m."
+    if closest:
+        debug_msg += f" Closest: '{closest.name}' at {int(min_dist)}m."
     
     raise HTTPException(status_code=404, detail=debug_msg)
 
+@router.get("/places/nearby", response_model=List[schemas.NearbyPlace])
+async def get_nearby_places(
+    lat: float,
+    lng: float,
+    radius: float = Query(800, gt=0, le=5000, description="Search radius in meters"),
+    limit: int = Query(20, ge=1, le=100),
+    type: Optional[str] = Query(None, description="Place type filter, comma separated (e.g. museum,restaurant)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Nearest active places sorted by distance, for the map screen.
+    """
+    types = {t.strip() for t in type.split(",") if t.strip()} if type else None
+    catalog = await catalog_service.get_async(db)
+
+    results = []
+    for dist, point in geo_service.nearby(catalog.geo, lat, lng, limit, radius, types):
+        place = catalog.places.get(point.id)
+        if place:
+            results.append(schemas.NearbyPlace(**place.model_dump(), distance_m=round(dist, 1)))
+    return results
+
+def match_fixes(index, fixes: List[schemas.TrajectoryFix]) -> schemas.TrajectoryResponse:
+    lats = [fix.lat for fix in fixes]
+    lngs = [fix.lng for fix in fixes]
+    located = geo_service.locate_many(index, lats, lngs)
+
+    matches = []
+    for fix, (closest, dist) in zip(fixes, located):
+        match = schemas.TrajectoryMatch(lat=fix.lat, lng=fix.lng, timestamp=fix.timestamp)
+        if closest:
+            match.distance_m = round(dist, 1)
+            if dist <= THRESHOLD_METERS:
+                match.place_id = closest.id
+                match.place_name = closest.name
+        matches.append(match)
+
+    return schemas.TrajectoryResponse(
+        matches=matches,
+        matched_count=sum(1 for match in matches if match.place_id is not None)
+    )
+
+@router.post("/places/match-trajectory", response_model=schemas.TrajectoryResponse)
+async def match_trajectory(request: schemas.TrajectoryRequest):
+    """
+    Match a recorded GPS track (at most TRAJECTORY_MAX_FIXES fixes) against places
+    in one call, using the same rules as /places/by-location.
+    """
+    async with AsyncSessionLocal() as db:
+        catalog = await catalog_service.get_async(db)
+    # The distance matrix and geofence checks are CPU-bound; keep them off the event loop
+    return await run_in_threadpool(match_fixes, catalog.geo, request.fixes)
+
+@router.websocket("/places/proximity")
+async def proximity_session(websocket: WebSocket):
+    """
+    Streaming alternative to polling /places/by-location. The client sends
+    {"lat", "lng", "timestamp"?} messages and only receives enter/exit events.
+    """
+    import json
+
+    await websocket.accept()
+    session = ProximitySession()
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                lat = float(message["lat"])
+                lng = float(message["lng"])
+                timestamp = message.get("timestamp")
+                if timestamp is not None:
+                    timestamp = float(timestamp)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                await websocket.send_json({"event": "error", "detail": "Expected {lat, lng, timestamp?}"})
+                continue
+
+            # Session only checks out a connection when the catalog version is due for a check
+            async with AsyncSessionLocal() as db:
+                catalog = await catalog_service.get_async(db)
+            events = session.update(catalog.geo, lat, lng, timestamp)
+            for event in events:
+                place = catalog.places.get(event["place_id"])
+                if event["event"] == "enter" and place:
+                    event["place"] = place.model_dump()
+
+            for event in events:
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/places/{place_id}", response_model=schemas.Place)
-async def get_place(place_id: int, db: Session = Depends(get_db)):
-    from app.models import all_models
-    place = db.query(all_models.Place).filter(all_models.Place.id == place_id, all_models.Place.is_active == True).first()
+async def get_place(
+    place_id: int,
+    lang: Optional[str] = Query(None, description="Return texts pre-translated into this language"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    place = (await catalog_service.get_async(db)).places.get(place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Place not found")
-    
-    place.location_lat = place.latitude
-    place.location_lng = place.longitude
-
-    if not place.description: place.description = place.short_desc
+    if lang:
+        return await place_translation_service.get_place(db, place, lang)
     return place
 
+async def load_place(place_id: int, lang: str) -> Tuple[schemas.Place, schemas.Place]:
+    """
+    A catalog place and its copy localized into `lang`, read in a short
+    session of its own. Endpoints that go on to wait for TTS or Gemini use
+    this instead of a request-scoped session, so no pooled connection (or
+    SQLite read transaction) stays open during the upstream call or stream.
+    """
+    async with AsyncSessionLocal() as db:
+        place = (await catalog_service.get_async(db)).places.get(place_id)
+        if not place:
+            raise HTTPException(status_code=404, detail="Place not found")
+        return place, await place_translation_service.get_place(db, place, lang)
+
 @router.get("/places/{place_id}/audio")
 async def get_place_audio(
     place_id: int, 
     lang: str = Query("en", description="Language code (en, tr, etc.)"),
     mode: str = Query("short", description="Narration mode (short, long)"),
-    db: Session = Depends(get_db)
+    stream: bool = Query(False, description="Stream raw audio/mpeg instead of base64 JSON"),
 ) -> schemas.AudioResponse:
-    from app.models import all_models
-    place = db.query(all_models.Place).filter(all_models.Place.id == place_id, all_models.Place.is_active == True).first()
-    if not place:
-        raise HTTPException(status_code=404, detail="Place not found")
+    # Determine text to read (falls back to the name), using the stored translation for `lang`
+    _, localized = await load_place(place_id, lang)
+    text = narration_text(localized, mode)
+    priority = PRIORITY_LONG if mode == "long" else PRIORITY_SHORT
     
-    # Determine text to read
-    text = place.description if mode == "long" else place.short_desc
-    if not text:
-        text = place.name # Fallback
-        
-    # In a real scenario, we would translate 'text' to 'lang' here.
-    # For this demo, we assume the text is compatible or we just read it.
-    # To make it cool, let's pretend to translate or use the existing text.
-    # If the text is ASCII (likely English) and lang is 'tr', gTTS will read English with TR accent.
-    # Ideally checking stored translations. For now, sending raw text to gTTS.
-    
-    mp3_fp = await ai_service.generate_audio_guide(text, lang)
+    if mode == "long":
+        # Long texts are synthesized as parallel sentence chunks, each cached on its own
+        if stream:
+            return await stream_audio_response(ai_service.stream_narration(text, lang, priority=priority))
+        mp3_fp = await ai_service.generate_narration(text, lang, priority=priority)
+    elif stream:
+        # Narrations are pre-rendered in the background, so usually this streams
+        # from a cache file opened up front, which LRU eviction can't pull away
+        return await stream_audio_response(ai_service.stream_audio_guide(text, lang, priority=priority))
+    else:
+        mp3_fp = await ai_service.generate_audio_guide(text, lang, priority=priority)
     
     if not mp3_fp:
         raise HTTPException(status_code=500, detail="Audio generation failed")
@@ -130,21 +262,28 @@ async def get_place_audio(
 @router.get("/places/{place_id}/intro", response_model=schemas.AudioResponse)
 async def get_place_intro(
     place_id: int, 
+    request: Request,
     lang: str = "en", 
-    db: Session = Depends(get_db)
+    stream: bool = Query(False, description="Stream raw audio/mpeg; the text is sent in the X-Text-Content header"),
 ):
     """
     Get a dynamic AI-generated welcome message for a place.
     """
-    place = crud.place.get(db=db, id=place_id)
-    if not place:
-        raise HTTPException(status_code=404, detail="Place not found")
+    place, localized = await load_place(place_id, lang)
         
-    # 1. Get text from Gemini (or Fallback)
-    intro_text = ai_service.get_welcome_message(place.name, lang)
+    # 1. Get text from the welcome cache, Gemini, or Fallback
+    fallback = intro_fallback(place, localized)
+    intro_text = await cancel_on_disconnect(request, welcome_service.get_message(place.name, lang, fallback))
     
     # 2. Convert to Audio
-    audio_buffer = await ai_service.generate_audio_guide(intro_text, lang)
+    if stream:
+        import urllib.parse
+        return await stream_audio_response(
+            ai_service.stream_audio_guide(intro_text, lang, priority=PRIORITY_INTRO),
+            headers={"X-Text-Content": urllib.parse.quote(intro_text)}
+        )
+    
+    audio_buffer = await ai_service.generate_audio_guide(intro_text, lang, priority=PRIORITY_INTRO)
     
     if not audio_buffer:
         raise HTTPException(status_code=500, detail="Audio generation failed")
@@ -167,9 +306,23 @@ async def translate_text(
     """
     return await ai_service.translate_text(request.text, request.source_lang, request.target_lang)
 
+@router.post("/translate/batch", response_model=schemas.BatchTranslationResponse)
+async def translate_batch(
+    request: schemas.BatchTranslationRequest
+):
+    """
+    Translate many texts with one language pair in a single request.
+    Results come back in the order of `texts`.
+    """
+    if len(request.texts) > settings.TRANSLATE_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.TRANSLATE_BATCH_MAX_TEXTS} texts per batch")
+    translations = await translation_service.translate_many(request.texts, request.source_lang, request.target_lang)
+    return schemas.BatchTranslationResponse(translations=translations)
+
 @router.post("/audio/speak", response_model=schemas.AudioResponse)
 async def speak_text(
-    request: schemas.TranslationRequest # Re-using this as it has 'text' and 'target_lang'
+    request: schemas.TranslationRequest, # Re-using this as it has 'text' and 'target_lang'
+    stream: bool = Query(False, description="Stream raw audio/mpeg instead of base64 JSON")
 ):
     """
     Generate audio for arbitrary text (e.g. Chat responses).
@@ -181,6 +334,9 @@ async def speak_text(
     # Service uses EN default if unmapped, but we mapped them.
     lang = request.target_lang
     
+    if stream:
+        return await stream_audio_response(ai_service.stream_audio_guide(request.text, lang))
+    
     mp3_fp = await ai_service.generate_audio_guide(request.text, lang)
     if not mp3_fp:
         raise HTTPException(status_code=500, detail="Audio generation failed")
@@ -195,46 +351,79 @@ async def speak_text(
         content_type="audio/mpeg"
     )
 
-@router.get("/places", response_model=List[schemas.Place])
-async def get_places(db: Session = Depends(get_db)):
-    from app.models import all_models
-    places = db.query(all_models.Place).filter(all_models.Place.is_active == True, all_models.Place.parent_id == None).all()
-    # Map fields for backward compatibility if needed
-    for p in places:
-        # Pydantic will map attributes, ensure naming matches or use aliases if models differ significantly
-        # DB: latitude/longitude vs Schema: location_lat/location_lng
-        p.location_lat = p.latitude
-        p.location_lng = p.longitude
-        if not p.description: p.description = p.short_desc
-    return places
+@router.get("/places", response_model=Union[List[schemas.PlaceSummary], List[schemas.Place]])
+async def get_places(
+    view: str = Query("full", pattern="^(summary|full)$", description="'summary' omits texts and boundary polygons"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Served from the in-memory catalog; fields are already mapped to the public schema
+    catalog = await catalog_service.get_async(db)
+    # Lists of the exact schema instances, so the Union response model keeps each view's fields
+    return list(catalog.top_level_summaries if view == "summary" else catalog.top_level)
 
 @router.get("/hotels", response_model=List[schemas.Hotel])
-async def get_hotels(db: Session = Depends(get_db)):
-    from app.models import all_models
-    return db.query(all_models.Hotel).filter(all_models.Hotel.is_active == True).all()
+async def get_hotels(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(all_models.Hotel).where(all_models.Hotel.is_active == True))
+    return result.scalars().all()
 
 @router.get("/restaurants", response_model=List[schemas.Restaurant])
-async def get_restaurants(db: Session = Depends(get_db)):
-    from app.models import all_models
-    return db.query(all_models.Restaurant).filter(all_models.Restaurant.is_active == True).all()
+async def get_restaurants(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(all_models.Restaurant).where(all_models.Restaurant.is_active == True))
+    return result.scalars().all()
 
 @router.get("/shops", response_model=List[schemas.Shop])
-async def get_shops(db: Session = Depends(get_db)):
-    from app.models import all_models
-    return db.query(all_models.Shop).filter(all_models.Shop.is_active == True).all()
+async def get_shops(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(all_models.Shop).where(all_models.Shop.is_active == True))
+    return result.scalars().all()
 
 @router.get("/config", response_model=List[schemas.ConfigResponse])
-async def get_config(db: Session = Depends(get_db)):
-    from app.models import all_models
-    return db.query(all_models.GlobalConfig).all()
+async def get_config(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(all_models.GlobalConfig))
+    return result.scalars().all()
+
+async def chat_passages(request: schemas.ChatRequest) -> List[str]:
+    # Short session: the chat endpoints then wait on Gemini without a connection
+    async with AsyncSessionLocal() as db:
+        catalog = await catalog_service.get_async(db)
+        # Purges issued through other workers, before the cache is consulted
+        await chat_cache.sync(db)
+    passages = retrieval_service.search(catalog, request.query, request.context, settings.CHAT_CONTEXT_PASSAGES)
+    return [f"{passage.place_name}: {passage.text}" for passage in passages]
 
 @router.post("/chat", response_model=schemas.ChatResponse)
-async def chat_with_guide(request: schemas.ChatRequest):
+async def chat_with_guide(request: schemas.ChatRequest, http_request: Request):
     """
-    Chat with the historical guide (Gemini).
+    Chat with the historical guide (Gemini), grounded on the best matching catalog passages.
     """
-    response_text = ai_service.get_chat_response(request.query, request.context, request.lang)
+    passages = await chat_passages(request)
+    response_text = await cancel_on_disconnect(
+        http_request,
+        ai_service.get_chat_response(request.query, request.context, request.lang, passages)
+    )
     return schemas.ChatResponse(response=response_text)
 
+@router.post("/chat/stream")
+async def chat_with_guide_stream(
+    request: schemas.ChatRequest,
+    audio: bool = Query(False, description="Also send an MP3 for each completed sentence"),
+):
+    """
+    Streaming version of /chat as Server-Sent Events: `token` events while
+    Gemini generates, `audio` events (base64 MP3 per sentence) if requested,
+    and a final `done` event with the full response.
+    """
+    import json
+    passages = await chat_passages(request)
+
+    async def events():
+        async for event, data in ai_service.stream_chat_events(request.query, request.context, request.lang, audio, passages):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 router.include_router(login.router, tags=["login"])
 router.include_router(admin.router, prefix="/admin", tags=["admin"])
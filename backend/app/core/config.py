@@ -9,6 +9,64 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./sql_app.db" # Default to SQLite for local development
+    ASYNC_DATABASE_URL: Optional[str] = None # Derived from DATABASE_URL (aiosqlite / asyncpg) if unset
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    
+    # Opt-in "production": WAL, tuned pragmas, read-only reader pools and one writer connection; "default": plain SQLite
+    SQLITE_PROFILE: str = "default"
+    SQLITE_MMAP_MB: int = 256
+    SQLITE_CACHE_MB: int = 64 # Page cache per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    
+    # Generated TTS audio cache
+    AUDIO_CACHE_DIR: str = "audio_cache"
+    AUDIO_CACHE_MAX_MB: int = 500
+    
+    # Largest GPS track accepted by /places/match-trajectory
+    TRAJECTORY_MAX_FIXES: int = 5000
+    
+    # TTS synthesis scheduling
+    TTS_CONCURRENCY: int = 4 # Concurrent edge_tts connections
+    TTS_QUEUE_SIZE: int = 32 # Waiting requests before answering 503
+    TTS_RETRY_AFTER_SECONDS: int = 5 # Retry-After used until run times are known
+    
+    # Background pre-rendering of place narrations
+    PRERENDER_ON_STARTUP: bool = True
+    PRERENDER_WORKERS: int = 2
+    PRERENDER_STARTUP_LEASE_SECONDS: int = 600 # Workers (re)started within this window don't queue it again
+    
+    # Upper bound for a single Gemini call before falling back
+    GEMINI_TIMEOUT_SECONDS: float = 15.0
+    
+    # Gemini circuit breaker
+    GEMINI_BREAKER_FAILURES: int = 3 # Consecutive errors before the circuit opens
+    GEMINI_BREAKER_RESET_SECONDS: float = 30.0 # Cooldown before a probe request
+    GEMINI_QUOTA_RESET_SECONDS: float = 60.0 # Cooldown after a 429 / quota error
+    
+    # Catalog passages added to each chat prompt
+    CHAT_CONTEXT_PASSAGES: int = 3
+    
+    # Chat answer cache
+    CHAT_CACHE_MAX_ENTRIES: int = 2000
+    CHAT_CACHE_TTL_HOURS: int = 24
+    CHAT_CACHE_SIMILARITY: float = 0.75 # Content-word (Jaccard) similarity needed for a fuzzy hit
+    
+    # Language place texts are written in; other narration languages are pre-translated
+    CONTENT_LANG: str = "en"
+    
+    # Translation (MyMemory)
+    TRANSLATE_API_URL: str = "https://api.mymemory.translated.net/get"
+    TRANSLATE_TIMEOUT_SECONDS: float = 5.0
+    TRANSLATE_MAX_CONNECTIONS: int = 10 # Pooled keep-alive connections
+    TRANSLATE_MEMORY_CACHE_SIZE: int = 5000 # Entries kept in memory in front of the translations table
+    TRANSLATE_BATCH_MAX_TEXTS: int = 200
+    TRANSLATE_BATCH_CONCURRENCY: int = 4 # Upstream requests in flight per batch
+    
+    # Cached Gemini welcome messages
+    WELCOME_CACHE_TTL_HOURS: int = 24 * 7
     
     # Mock AI Keys (Not actually used in mock mode, but good practice)
     OPENAI_API_KEY: Optional[str] = None
@@ -0,0 +1,118 @@
+import time
+from typing import Callable, List, NamedTuple, Sequence
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from app.models import all_models
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# --- Idempotent building blocks ---
+# Migrations may meet a database where create_all already built the latest
+# schema, so every step checks before changing anything.
+
+def add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        columns = {info["name"] for info in inspect(conn).get_columns(table)}
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return upgrade
+
+
+def drop_column(table: str, column: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        inspector = inspect(conn)
+        if not inspector.has_table(table):
+            # Dropped by a later migration, which a new database never had
+            return
+        columns = {info["name"] for info in inspector.get_columns(table)}
+        if column in columns:
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+    return upgrade
+
+
+def drop_table(table: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    return upgrade
+
+
+def create_index(name: str, table: str, columns: Sequence[str]) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+    return upgrade
+
+
+def delete_rows(table: str, where: str) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        conn.execute(text(f"DELETE FROM {table} WHERE {where}"))
+    return upgrade
+
+
+def steps(*upgrades: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection):
+        for step in upgrades:
+            step(conn)
+    return upgrade
+
+
+# Append only: never renumber or edit a migration that has shipped
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Add places.boundary_points", add_column("places", "boundary_points", "JSON")),
+    Migration(2, "Add places.parent_id", add_column("places", "parent_id", "INTEGER REFERENCES places(id)")),
+    Migration(3, "Indexes for list and lookup filters", steps(
+        create_index("ix_places_active_parent", "places", ["is_active", "parent_id"]),
+        create_index("ix_places_lat_lng", "places", ["latitude", "longitude"]),
+        create_index("ix_hotels_is_active", "hotels", ["is_active"]),
+        create_index("ix_restaurants_is_active", "restaurants", ["is_active"]),
+        create_index("ix_shops_is_active", "shops", ["is_active"]),
+        create_index("ix_plans_user_id", "plans", ["user_id"]),
+    )),
+    Migration(4, "Drop place_audio.audio_key", drop_column("place_audio", "audio_key")),
+    Migration(5, "Drop place translations that are never served", delete_rows(
+        "place_translations", "field IN ('story_text', 'child_text')"
+    )),
+    Migration(6, "Drop place_audio; pre-render stats are kept in memory", drop_table("place_audio")),
+]
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    table = all_models.SchemaMigration.__table__
+    return [row.version for row in conn.execute(table.select().order_by(table.c.version))]
+
+
+def run_migrations(engine: Engine, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Applies pending migrations in version order, each in its own
+    transaction together with its row in schema_migrations. Returns the
+    versions applied by this call.
+    """
+    table = all_models.SchemaMigration.__table__
+    table.create(engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        done = set(applied_versions(conn))
+
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(table.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=time.time(),
+                ))
+        except IntegrityError:
+            # Another worker applied it concurrently
+            continue
+        applied.append(migration.version)
+        print(f"Applied migration {migration.version}: {migration.description}")
+    return applied
@@ -1,17 +1,186 @@
-from sqlalchemy import create_engine
+from typing import AsyncIterator, Callable, TypeVar
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
+
+def async_database_url(url: str) -> str:
+    """
+    Async driver URL for a sync DATABASE_URL: aiosqlite for SQLite, asyncpg for PostgreSQL.
+    """
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+def sqlite_pragmas(read_only: bool):
+    """
+    Connect hook for the SQLite production profile. WAL lets readers keep
+    reading while a write commits; read-only connections also refuse writes.
+    """
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # Persistent database setting; only the writer needs to switch it
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_MB * 1024}")  # negative = KiB
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+# WAL, tuned pragmas and a reader pool separate from a single writer connection
+SQLITE_PRODUCTION = settings.DATABASE_URL.startswith("sqlite") and settings.SQLITE_PROFILE == "production"
+
+# A single connection serializes every write of the process (admin, startup
+# seeding, and async code through run_write) instead of having several
+# connections contend for SQLite's write lock
+writer_pool_args = dict(pool_size=1, max_overflow=0, pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS) if SQLITE_PRODUCTION else {}
+
 engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    settings.DATABASE_URL, connect_args=connect_args, **writer_pool_args
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sync reads (login, admin listings and stats) get their own pool, so they
+# never queue on the writer connection. Outside the SQLite production
+# profile this is the same engine as the writer.
+if SQLITE_PRODUCTION:
+    read_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    )
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engine for the public read endpoints, so their queries don't block the event loop
+async_engine = create_async_engine(
+    async_url,
+    connect_args=connect_args,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if SQLITE_PRODUCTION:
+    event.listen(engine, "connect", sqlite_pragmas(read_only=False))
+    event.listen(read_engine, "connect", sqlite_pragmas(read_only=True))
+    event.listen(async_engine.sync_engine, "connect", sqlite_pragmas(read_only=True))
+
+T = TypeVar("T")
+
+
+async def run_write(func: Callable[..., T], *args) -> T:
+    """
+    Writes from async code (caches, pre-render bookkeeping) go through the
+    sync writer engine in the threadpool as func(db, *args), so the process
+    has one writer however the write was started.
+    """
+    def call():
+        with SessionLocal() as db:
+            return func(db, *args)
+    return await run_in_threadpool(call)
+
 Base = declarative_base()
 
+
+class PoolMetrics:
+    """
+    Counts connection pool events of an engine, for /admin/db-pool.
+    """
+
+    def __init__(self, sync_engine):
+        self.pool = sync_engine.pool
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        # Includes connections found dead by pre-ping
+        self.invalidated += 1
+
+    def stats(self) -> dict:
+        pool = self.pool
+        stats = {
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidated": self.invalidated,
+        }
+        # Only queue pools have a fixed size and overflow
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        return stats
+
+
+engine_metrics = PoolMetrics(engine)
+read_engine_metrics = PoolMetrics(read_engine) if read_engine is not engine else None
+async_engine_metrics = PoolMetrics(async_engine.sync_engine)
+
+
+def pool_stats() -> dict:
+    stats = {
+        "sqlite_production": SQLITE_PRODUCTION,
+        "sync": engine_metrics.stats(),
+        "async": async_engine_metrics.stats(),
+    }
+    if read_engine_metrics:
+        stats["sync_read"] = read_engine_metrics.stats()
+    return stats
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """
+    Session for request handlers that only read; it never holds the writer.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
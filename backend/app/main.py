@@ -1,14 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.api.endpoints import api_v1, upload
-from app.db.session import engine, Base
+from app.db.migrations import run_migrations
+from app.db.session import engine, Base, run_write
 from app.models import all_models
+from app.services.tts_scheduler import TTSQueueFullError
 import os
 
-# Create tables
+# Create tables, then bring databases created by older versions up to date
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -25,11 +29,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Text-Content"], # Intro text when audio is streamed
 )
 
 app.include_router(api_v1.router, prefix=settings.API_V1_STR)
 app.include_router(upload.router, prefix=settings.API_V1_STR)
 
+@app.exception_handler(TTSQueueFullError)
+async def tts_queue_full_handler(request: Request, exc: TTSQueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Audio service is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/")
 def root():
     return {"message": "Welcome to Ichan Kala AI Guide API"}
@@ -43,7 +56,35 @@ def init_data():
     try:
         init_db(db)
         print("Database initialized and seeded")
+
+        # Workers build their catalog on first use; only make sure the version row exists
+        from app.services.catalog_service import catalog_service
+        catalog_service.ensure_version(db)
     except Exception as e:
         print(f"Error initializing data: {e}")
     finally:
         db.close()
+
+@app.on_event("startup")
+async def start_prerender():
+    from app.services.prerender_service import prerender_service
+
+    prerender_service.start()
+    # Only one of the workers booting together queues the full job
+    if settings.PRERENDER_ON_STARTUP and await run_write(prerender_service.claim_startup_run):
+        prerender_service.enqueue_all()
+
+@app.on_event("shutdown")
+async def stop_prerender():
+    from app.services.prerender_service import prerender_service
+    await prerender_service.stop()
+
+@app.on_event("shutdown")
+async def close_translation_client():
+    from app.services.translation_service import translation_service
+    await translation_service.close()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    from app.db.session import async_engine
+    await async_engine.dispose()
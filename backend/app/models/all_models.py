@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, Float, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Text, Float, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -17,6 +17,10 @@ class User(Base):
 
 class Place(Base):
     __tablename__ = "places"
+    __table_args__ = (
+        Index("ix_places_active_parent", "is_active", "parent_id"), # Catalog and list filters
+        Index("ix_places_lat_lng", "latitude", "longitude"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -37,13 +41,46 @@ class Place(Base):
     parent_id = Column(Integer, ForeignKey("places.id"), nullable=True) # For nested places (Micro-Locations)
     is_active = Column(Boolean, default=True)
 
+class WelcomeMessage(Base):
+    __tablename__ = "welcome_messages"
+    __table_args__ = (UniqueConstraint("place_name", "lang"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    place_name = Column(String, index=True)
+    lang = Column(String)
+    text = Column(Text) # Gemini output, fallbacks are never stored
+    created_at = Column(Float) # Unix timestamp, checked against WELCOME_CACHE_TTL_HOURS
+
+class PlaceTranslation(Base):
+    __tablename__ = "place_translations"
+    __table_args__ = (UniqueConstraint("place_id", "lang", "field"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    place_id = Column(Integer, ForeignKey("places.id"))
+    lang = Column(String)
+    field = Column(String) # 'short_desc', 'description', 'story_text', 'child_text'
+    text = Column(Text)
+    source_hash = Column(String) # sha256 of the source text this was translated from
+
+class Translation(Base):
+    __tablename__ = "translations"
+    __table_args__ = (UniqueConstraint("text_hash", "source_lang", "target_lang"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    text_hash = Column(String) # sha256 of text, keeps the unique index small
+    source_lang = Column(String)
+    target_lang = Column(String)
+    text = Column(Text)
+    translated = Column(Text)
+    created_at = Column(Float) # Unix timestamp
+
 class Plan(Base):
     __tablename__ = "plans"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     content = Column(JSON) # Stores the full itinerary structure
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     
     owner = relationship("User", back_populates="plans")
 
@@ -64,7 +101,7 @@ class Hotel(Base):
     contact_info = Column(String)
     commission_rate = Column(Float, default=0.0)
     photo_url = Column(String, nullable=True)
-    is_active = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=False, index=True)
 
 class Restaurant(Base):
     __tablename__ = "restaurants"
@@ -75,7 +112,7 @@ class Restaurant(Base):
     price_level = Column(String) # $, $$, $$$
     photo_url = Column(String, nullable=True)
     is_recommended = Column(Boolean, default=False)
-    is_active = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=False, index=True)
 
 class Shop(Base):
     __tablename__ = "shops"
@@ -87,7 +124,37 @@ class Shop(Base):
     commission_rate = Column(Float, default=0.0)
     admin_notes = Column(Text, nullable=True)
     photo_url = Column(String, nullable=True)
-    is_active = Column(Boolean, default=False)
+    is_active = Column(Boolean, default=False, index=True)
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_at = Column(Float) # Unix timestamp
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True) # Single row, id=1
+    version = Column(Integer, default=0) # Bumped on every admin edit of places
+
+class ChatCachePurge(Base):
+    # Admin purges of the per-process chat cache, replayed by every worker
+    __tablename__ = "chat_cache_purges"
+
+    id = Column(Integer, primary_key=True)
+    context = Column(String, nullable=True) # None matches every entry
+    lang = Column(String, nullable=True)
+    query = Column(String, nullable=True)
+    created_at = Column(Float) # Unix timestamp
+
+class JobLease(Base):
+    # Lets one worker of many claim a job, e.g. the startup pre-render
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    claimed_at = Column(Float) # Unix timestamp
 
 class GlobalConfig(Base):
     __tablename__ = "global_config"
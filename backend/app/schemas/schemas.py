@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
+from app.core.config import settings
 
 # User
 class UserBase(BaseModel):
@@ -34,6 +35,46 @@ class Place(PlaceBase):
     class Config:
         from_attributes = True
 
+class PlaceSummary(BaseModel):
+    """
+    List/map projection of a place: only the one-line teaser, no long
+    texts or boundary polygon.
+    """
+    id: int
+    name: str
+    short_desc: Optional[str] = None
+    location_lat: float = 0.0
+    location_lng: float = 0.0
+    type: str
+    photo_url: Optional[str] = None
+    parent_id: Optional[int] = None
+    class Config:
+        from_attributes = True
+
+class NearbyPlace(Place):
+    distance_m: float
+
+# Trajectory matching
+class TrajectoryFix(BaseModel):
+    lat: float
+    lng: float
+    timestamp: Optional[float] = None
+
+class TrajectoryRequest(BaseModel):
+    fixes: List[TrajectoryFix] = Field(..., max_length=settings.TRAJECTORY_MAX_FIXES)
+
+class TrajectoryMatch(BaseModel):
+    lat: float
+    lng: float
+    timestamp: Optional[float] = None
+    place_id: Optional[int] = None # None when no place is within the threshold
+    place_name: Optional[str] = None
+    distance_m: Optional[float] = None # Distance to the closest place, 0 inside a boundary polygon
+
+class TrajectoryResponse(BaseModel):
+    matches: List[TrajectoryMatch]
+    matched_count: int
+
 # Hotel
 class HotelBase(BaseModel):
     name: str
@@ -118,6 +159,14 @@ class TranslationResponse(BaseModel):
     original: str
     translated: str
 
+class BatchTranslationRequest(BaseModel):
+    texts: List[str]
+    source_lang: str
+    target_lang: str
+
+class BatchTranslationResponse(BaseModel):
+    translations: List[TranslationResponse] # Same order as the request texts
+
 class ChatRequest(BaseModel):
     query: str
     context: str = "General Ichan Kala"
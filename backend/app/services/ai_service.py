@@ -1,7 +1,17 @@
 from io import BytesIO
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+import base64
 import edge_tts
+from app.core.config import settings
 from app.schemas import schemas
+from app.services.audio_cache import audio_cache
+from app.services.chat_cache import chat_cache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.single_flight import single_flight, single_flight_stream
+from app.services.translation_service import translation_service
+from app.services.tts_scheduler import tts_scheduler, TTSQueueFullError, PRIORITY_INTRO, PRIORITY_SHORT
 import asyncio
+import re
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
@@ -13,6 +23,27 @@ GENAI_KEY = os.getenv("GEMINI_API_KEY")
 if GENAI_KEY:
     genai.configure(api_key=GENAI_KEY)
 
+# 'lite' model for better efficiency/quota
+GEMINI_MODEL = 'gemini-2.0-flash-lite-preview-02-05'
+_gemini_model = None
+
+def get_gemini_model() -> genai.GenerativeModel:
+    """
+    Long-lived model client shared by all requests.
+    """
+    global _gemini_model
+    if _gemini_model is None:
+        _gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+    return _gemini_model
+
+# Fails fast with fallbacks while Gemini is erroring or out of quota
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=settings.GEMINI_BREAKER_FAILURES,
+    reset_seconds=settings.GEMINI_BREAKER_RESET_SECONDS,
+    quota_reset_seconds=settings.GEMINI_QUOTA_RESET_SECONDS,
+)
+
 # Fallback content for when AI is offline/quota exceeded
 FALLBACK_DATA = {
     "Kalta Minor Minaret": "Welcome to the Kalta Minor Minaret. This iconic turquoise tower was intended to be the tallest minaret in the Islamic world but was never finished. Its vibrant blue tiles make it a symbol of Khiva.",
@@ -25,79 +56,372 @@ FALLBACK_DATA = {
     "Muhammad Amin Khan Madrasah": "Welcome to the Muhammad Amin Khan Madrasah. Historically the largest madrasah in Central Asia, it is now the Orient Star Hotel. It stands right next to the Kalta Minor."
 }
 
+# Edge TTS voice per supported language
+VOICES = {
+    "en": "en-US-ChristopherNeural",
+    "tr": "tr-TR-AhmetNeural",
+    "ru": "ru-RU-DmitryNeural",
+    "de": "de-DE-ConradNeural",
+    "fr": "fr-FR-HenriNeural",
+}
+
+# Read size when streaming cached audio from disk
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Long narrations are synthesized as sentence groups of about this many characters
+NARRATION_CHUNK_CHARS = 400
+# Chunks of one narration synthesized at the same time (still subject to tts_scheduler)
+NARRATION_PARALLEL_CHUNKS = 3
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
 class MockAIService:
     @staticmethod
-    async def generate_audio_guide(text: str, lang: str = 'en') -> BytesIO:
+    def get_voice(lang: str = 'en') -> str:
+        """
+        Neural voice used for a language.
+        """
+        # Deep, documentary-style male voice by default
+        return VOICES.get(lang, "en-US-ChristopherNeural")
+
+    @staticmethod
+    async def generate_audio_guide(text: str, lang: str = 'en', rate: str = "+0%", priority: int = PRIORITY_SHORT) -> BytesIO:
         """
         Generates audio from text using Microsoft Edge TTS (free neural voices).
         Returns a BytesIO object containing the MP3 data.
+        Results are cached on disk by (text, voice, rate). Synthesis waits for a
+        tts_scheduler slot; raises TTSQueueFullError if the queue is full.
         """
+        data = await MockAIService._synthesize(text, MockAIService.get_voice(lang), rate, priority)
+        # Each caller gets its own buffer, the synthesized bytes may be shared
+        return BytesIO(data) if data else None
+
+    @staticmethod
+    @single_flight(key=lambda text, voice, rate, priority=PRIORITY_SHORT: (text, voice, rate))
+    async def _synthesize(text: str, voice: str, rate: str, priority: int = PRIORITY_SHORT) -> Optional[bytes]:
         try:
-            # Select voice based on language
-            voice = "en-US-ChristopherNeural"  # Deep, documentary-style male voice
-            if lang == 'tr':
-                voice = "tr-TR-AhmetNeural"
-            elif lang == 'ru':
-                voice = "ru-RU-DmitryNeural"
-            elif lang == 'de':
-                voice = "de-DE-ConradNeural"
-            elif lang == 'fr':
-                voice = "fr-FR-HenriNeural"
-            
-            communicate = edge_tts.Communicate(text, voice)
-            mp3_fp = BytesIO()
+            cache_key = audio_cache.make_key(text, voice, rate)
+            cached = audio_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    mp3_fp.write(chunk["data"])
+            async with tts_scheduler.slot(priority):
+                communicate = edge_tts.Communicate(text, voice, rate=rate)
+                mp3_fp = BytesIO()
+                
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        mp3_fp.write(chunk["data"])
             
-            mp3_fp.seek(0)
-            return mp3_fp
+            data = mp3_fp.getvalue()
+            if data:
+                audio_cache.put(cache_key, data)
+            return data
+        except TTSQueueFullError:
+            raise
         except Exception as e:
             print(f"Error generating audio: {e}")
             return None
 
     @staticmethod
-    def get_chat_response(query: str, context: str, lang: str = 'en') -> str:
+    @single_flight_stream(key=lambda text, lang='en', rate="+0%", priority=PRIORITY_SHORT: (text, lang, rate))
+    async def stream_audio_guide(text: str, lang: str = 'en', rate: str = "+0%", priority: int = PRIORITY_SHORT) -> AsyncIterator[bytes]:
         """
-        Generates a chat response using Gemini.
+        Yields MP3 chunks as Edge TTS produces them, so playback can start
+        before synthesis has finished. Uses the same disk cache as generate_audio_guide.
+        Errors are raised to the caller instead of returning None.
+        Concurrent requests for the same clip share one edge_tts connection.
+        """
+        voice = MockAIService.get_voice(lang)
+        cache_key = audio_cache.make_key(text, voice, rate)
+        cached = audio_cache.open(cache_key)
+        if cached is not None:
+            with cached:
+                while True:
+                    data = cached.read(STREAM_CHUNK_BYTES)
+                    if not data:
+                        return
+                    yield data
+
+        writer = audio_cache.writer(cache_key)
+        completed = False
+        has_audio = False
+        try:
+            # The slot is held for the whole stream, that's how long the edge_tts connection lives
+            async with tts_scheduler.slot(priority):
+                communicate = edge_tts.Communicate(text, voice, rate=rate)
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        has_audio = True
+                        writer.write(chunk["data"])
+                        yield chunk["data"]
+            completed = True
+        finally:
+            # Don't cache audio cut short by an error or a client disconnect
+            if completed and has_audio:
+                writer.commit()
+            else:
+                writer.abort()
+
+    @staticmethod
+    def split_narration(text: str, max_chars: int = NARRATION_CHUNK_CHARS) -> List[str]:
+        """
+        Splits text at sentence boundaries into chunks of up to `max_chars`.
+        The first chunk is a single sentence so playback can start quickly.
+        """
+        sentences = [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+        if not sentences:
+            return [text]
+        chunks = [sentences[0]]
+        current = ""
+        for sentence in sentences[1:]:
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    async def stream_narration(text: str, lang: str = 'en', rate: str = "+0%", priority: int = PRIORITY_SHORT) -> AsyncIterator[bytes]:
+        """
+        Streams a long narration as one MP3: the first sentence is streamed
+        live while the remaining chunks are synthesized in parallel, then
+        everything is emitted in order. Each chunk is cached separately, so
+        editing one paragraph only re-synthesizes that part.
+        """
+        chunks = MockAIService.split_narration(text)
+        voice = MockAIService.get_voice(lang)
+        limit = asyncio.Semaphore(NARRATION_PARALLEL_CHUNKS)
+
+        async def render(chunk):
+            async with limit:
+                # Once the first chunk is out, a full TTS queue must not cut the
+                # narration short; wait for room like the pre-render worker does
+                while True:
+                    try:
+                        return await MockAIService._synthesize(chunk, voice, rate, priority)
+                    except TTSQueueFullError as e:
+                        await asyncio.sleep(e.retry_after)
+
+        rest = [asyncio.ensure_future(render(chunk)) for chunk in chunks[1:]]
+        try:
+            async for data in MockAIService.stream_audio_guide(chunks[0], lang, rate, priority):
+                yield data
+            for task in rest:
+                data = await task
+                if not data:
+                    raise RuntimeError("Audio generation failed for a narration chunk")
+                yield data
+        finally:
+            for task in rest:
+                task.cancel()
+            # Collect results so failed tasks don't log "exception was never retrieved"
+            await asyncio.gather(*rest, return_exceptions=True)
+
+    @staticmethod
+    async def generate_narration(text: str, lang: str = 'en', rate: str = "+0%", priority: int = PRIORITY_SHORT) -> BytesIO:
+        """
+        Buffered version of stream_narration. Returns None on failure.
+        """
+        mp3_fp = BytesIO()
+        try:
+            async for data in MockAIService.stream_narration(text, lang, rate, priority):
+                mp3_fp.write(data)
+        except TTSQueueFullError:
+            raise
+        except Exception as e:
+            print(f"Error generating narration: {e}")
+            return None
+        mp3_fp.seek(0)
+        return mp3_fp if mp3_fp.getbuffer().nbytes else None
+
+    @staticmethod
+    @single_flight(key=lambda query, context, lang='en', passages=(): (" ".join(query.lower().split()), context, lang))
+    async def get_chat_response(query: str, context: str, lang: str = 'en', passages: Sequence[str] = ()) -> str:
+        """
+        Generates a chat response using Gemini, grounded on the given catalog passages.
+        Repeated (or near-identical) questions are answered from chat_cache.
+        Uses the async client so the event loop keeps serving other requests,
+        and gives up after GEMINI_TIMEOUT_SECONDS.
         """
         if not GENAI_KEY:
             return "Error: Gemini API Key not configured."
             
-        try:
-            # Switch to 'lite' model
-            model = genai.GenerativeModel('gemini-2.0-flash-lite-preview-02-05')
+        cached = chat_cache.get(query, context, lang)
+        if cached:
+            return cached
+        version = chat_cache.version
             
-            system_instruction = (
-                f"You are a knowledgeable and friendly historical tour guide in Ichan Kala, Khiva using the name 'Hiva Guide'. "
-                f"The user is currently at or asking about: '{context}'. "
-                f"Answer their question briefly and naturally in the language '{lang}'. "
-                f"Keep answers under 3 sentences unless asked for more detail. "
-                f"If the question is unrelated to Khiva or history, gracefully steer it back."
+        try:
+            with gemini_breaker.call():
+                response = await asyncio.wait_for(
+                    get_gemini_model().generate_content_async(MockAIService._chat_prompt(query, context, lang, passages)),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
+                )
+            text = response.text
+            chat_cache.put(query, context, lang, text, version)
+            return text
+        except Exception as e:
+            return MockAIService._chat_fallback(e)
+
+    @staticmethod
+    def _chat_prompt(query: str, context: str, lang: str, passages: Sequence[str] = ()) -> str:
+        system_instruction = (
+            f"You are a knowledgeable and friendly historical tour guide in Ichan Kala, Khiva using the name 'Hiva Guide'. "
+            f"The user is currently at or asking about: '{context}'. "
+            f"Answer their question briefly and naturally in the language '{lang}'. "
+            f"Keep answers under 3 sentences unless asked for more detail. "
+            f"If the question is unrelated to Khiva or history, gracefully steer it back."
+        )
+        if passages:
+            notes = "\n".join(f"- {passage}" for passage in passages)
+            system_instruction += (
+                f"\nBase your answer on these notes from the guide's own materials when they are relevant:\n{notes}"
             )
+        return f"{system_instruction}\nUser: {query}"
+
+    @staticmethod
+    def _chat_fallback(e: Exception) -> str:
+        print(f"Gemini Chat Error: {str(e) or 'timed out'}")
+        # Robust fallback logic
+        if "429" in str(e):
+            return "My connection is very busy right now. But I can tell you that you are in the heart of history!"
+        return "I'm having a little trouble connecting to my knowledge base right now."
+
+    @staticmethod
+    async def stream_chat_response(query: str, context: str, lang: str = 'en', passages: Sequence[str] = ()) -> AsyncIterator[str]:
+        """
+        Like get_chat_response, but yields text pieces as Gemini generates them.
+        Each piece must arrive within GEMINI_TIMEOUT_SECONDS. If the model fails
+        before producing anything, the usual fallback is yielded instead.
+        A cached answer is yielded as a single piece.
+        """
+        if not GENAI_KEY:
+            yield "Error: Gemini API Key not configured."
+            return
             
-            response = model.generate_content(f"{system_instruction}\nUser: {query}")
-            return response.text
+        cached = chat_cache.get(query, context, lang)
+        if cached:
+            yield cached
+            return
+        version = chat_cache.version
+            
+        produced = False
+        pieces = []
+        try:
+            with gemini_breaker.call():
+                response = await asyncio.wait_for(
+                    get_gemini_model().generate_content_async(MockAIService._chat_prompt(query, context, lang, passages), stream=True),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.GEMINI_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.text:
+                        produced = True
+                        pieces.append(chunk.text)
+                        yield chunk.text
+            # Only complete answers are cached
+            chat_cache.put(query, context, lang, "".join(pieces), version)
         except Exception as e:
-            print(f"Gemini Chat Error: {e}")
-            # Robust fallback logic
-            if "429" in str(e):
-                return "My connection is very busy right now. But I can tell you that you are in the heart of history!"
-            return "I'm having a little trouble connecting to my knowledge base right now."
+            if produced:
+                # The answer is already partly delivered; just end it
+                print(f"Gemini Chat Error: {str(e) or 'timed out'}")
+                return
+            yield MockAIService._chat_fallback(e)
+
+    @staticmethod
+    async def stream_chat_events(query: str, context: str, lang: str = 'en', audio: bool = False, passages: Sequence[str] = ()) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Chat answer as (event, data) pairs: a "token" per generated text piece
+        and, with `audio`, an "audio" MP3 for every completed sentence (in order,
+        synthesized while the text keeps streaming), then "done".
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        speakers = []
+
+        async def speak(index, sentence, previous):
+            try:
+                mp3_fp = await MockAIService.generate_audio_guide(sentence, lang, priority=PRIORITY_INTRO)
+            except TTSQueueFullError:
+                mp3_fp = None
+            if previous:
+                await previous  # Keep audio events in sentence order
+            if mp3_fp:
+                audio_b64 = base64.b64encode(mp3_fp.getvalue()).decode('utf-8')
+                queue.put_nowait(("audio", {"index": index, "text": sentence, "audio_base64": audio_b64, "content_type": "audio/mpeg"}))
+
+        def schedule(sentence):
+            previous = speakers[-1] if speakers else None
+            speakers.append(asyncio.ensure_future(speak(len(speakers), sentence, previous)))
+
+        async def produce():
+            full_text, pending = "", ""
+            try:
+                async for token in MockAIService.stream_chat_response(query, context, lang, passages):
+                    full_text += token
+                    queue.put_nowait(("token", {"text": token}))
+                    if audio:
+                        pending += token
+                        *sentences, pending = SENTENCE_END.split(pending)
+                        for sentence in sentences:
+                            if sentence.strip():
+                                schedule(sentence.strip())
+                if audio and pending.strip():
+                    schedule(pending.strip())
+                if speakers:
+                    await asyncio.gather(*speakers, return_exceptions=True)
+            except Exception as e:
+                print(f"Chat stream error: {e}")
+            finally:
+                queue.put_nowait(("done", {"response": full_text}))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event == "done":
+                    return
+        finally:
+            for task in [producer, *speakers]:
+                task.cancel()
 
     @staticmethod
-    def get_welcome_message(place_name: str, lang: str = 'en') -> str:
+    async def get_welcome_message(place_name: str, lang: str = 'en') -> str:
         """
         Generates a short, engaging welcome speech for a place using Gemini.
+        Falls back to FALLBACK_DATA on errors or after GEMINI_TIMEOUT_SECONDS.
         """
         if not GENAI_KEY:
             return f"Welcome to {place_name}."
+        text = await MockAIService.generate_welcome_message(place_name, lang)
+        return text or MockAIService.fallback_welcome_message(place_name)
+
+    @staticmethod
+    def fallback_welcome_message(place_name: str) -> str:
+        # Smart Fallback using predefined content
+        if place_name in FALLBACK_DATA:
+            return FALLBACK_DATA[place_name]
             
-        try:
-            # Switch to 'lite' model for better efficiency/quota
-            model = genai.GenerativeModel('gemini-2.0-flash-lite-preview-02-05')
+        return f"Welcome to {place_name}. This is one of the most fascinating historical sites in Ichan Kala."
+
+    @staticmethod
+    @single_flight()
+    async def generate_welcome_message(place_name: str, lang: str = 'en') -> Optional[str]:
+        """
+        Welcome speech straight from Gemini, or None if the model is not
+        configured or the call fails, so callers can tell it from a fallback.
+        """
+        if not GENAI_KEY:
+            return None
             
+        try:
             prompt = (
                 f"Act as an enthusiastic and knowledgeable tour guide in Khiva named 'Hiva Guide'. "
                 f"The user has just arrived at the structure: '{place_name}'. "
@@ -108,17 +432,17 @@ class MockAIService:
                 f"Language: {lang}."
             )
             
-            response = model.generate_content(prompt)
+            with gemini_breaker.call():
+                response = await asyncio.wait_for(
+                    get_gemini_model().generate_content_async(prompt),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
+                )
             # Extra cleanup just in case
             clean_text = response.text.replace('```', '').replace('*', '').replace('>', '').replace('</blockquote>', '').strip()
-            return clean_text
+            return clean_text or None
         except Exception as e:
-            print(f"Gemini Welcome Error: {e}")
-            # Smart Fallback using predefined content
-            if place_name in FALLBACK_DATA:
-                return FALLBACK_DATA[place_name]
-                
-            return f"Welcome to {place_name}. This is one of the most fascinating historical sites in Ichan Kala."
+            print(f"Gemini Welcome Error: {str(e) or 'timed out'}")
+            return None
 
     @staticmethod
     def identify_place(image_bytes: bytes) -> schemas.IdentificationResponse:
@@ -158,42 +482,9 @@ class MockAIService:
     @staticmethod
     async def translate_text(text: str, source_lang: str, target_lang: str) -> schemas.TranslationResponse:
         """
-        Translates text using the free MyMemory API.
+        Translates text using the free MyMemory API, through translation_service's caches.
         """
-        import urllib.parse
-        import urllib.request
-        import json
-        
-        try:
-            # Prepare URL safely
-            encoded_text = urllib.parse.quote(text)
-            lang_pair = f"{source_lang}|{target_lang}"
-            url = f"https://api.mymemory.translated.net/get?q={encoded_text}&langpair={lang_pair}"
-            
-            # Simple synchronous request (blocking is fine for prototype)
-            # wrapping in try/except to catch ANY network/parsing error
-            try:
-                # 5 second timeout to prevent hanging
-                with urllib.request.urlopen(url, timeout=5.0) as response:
-                    data = json.loads(response.read().decode())
-                    
-                if 'responseData' in data and data['responseData']['translatedText']:
-                     return schemas.TranslationResponse(
-                        original=text,
-                        translated=data['responseData']['translatedText']
-                    )
-            except Exception as e:
-                print(f"MyMemory API Failed: {e}")
-                # Proceed to fallback below
-        
-        except Exception as e:
-            print(f"Critical Translation Error: {e}")
-            
-        # Ultimate Fallback if API fails
-        return schemas.TranslationResponse(
-            original=text,
-            translated=f"[{target_lang}] {text}" 
-        )
+        return await translation_service.translate(text, source_lang, target_lang)
 
 
 ai_service = MockAIService()
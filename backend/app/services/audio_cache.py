@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+from typing import BinaryIO, Optional
+from app.core.config import settings
+
+
+class AudioCache:
+    """
+    Content-addressed MP3 store on disk. Files are named by a hash of
+    (text, voice, rate), so identical narrations are synthesized once and
+    survive restarts. Reads refresh a file's mtime; when the directory grows
+    past `max_bytes` the least recently used files are evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".mp3"))
+
+    @staticmethod
+    def make_key(text: str, voice: str, rate: str = "+0%") -> str:
+        return hashlib.sha256(f"{voice}\n{rate}\n{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """
+        Like `get`, but returns an open file so large entries can be streamed.
+        """
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def put(self, key: str, data: bytes):
+        writer = self.writer(key)
+        writer.write(data)
+        writer.commit()
+
+    def writer(self, key: str) -> "AudioCacheWriter":
+        """
+        Incremental writer for audio that arrives in chunks; nothing is
+        visible in the cache until `commit`.
+        """
+        return AudioCacheWriter(self, key)
+
+    def _commit(self, tmp_path: str, key: str):
+        path = self._path(key)
+        try:
+            size = os.path.getsize(tmp_path)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)  # Atomic, readers never see a partial file
+        except OSError as e:
+            print(f"Audio cache write failed: {e}")
+            return
+        with self._lock:
+            self._size += size - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".mp3")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class AudioCacheWriter:
+    def __init__(self, cache: AudioCache, key: str):
+        self._cache = cache
+        self._key = key
+        self._tmp_path = f"{cache._path(key)}.{threading.get_ident()}.{id(self)}.tmp"
+        self._file = None
+        self._failed = False
+        try:
+            self._file = open(self._tmp_path, "wb")
+        except OSError as e:
+            print(f"Audio cache write failed: {e}")
+            self._failed = True
+
+    def write(self, data: bytes):
+        if self._failed:
+            return
+        try:
+            self._file.write(data)
+        except OSError as e:
+            print(f"Audio cache write failed: {e}")
+            self.abort()
+
+    def commit(self):
+        if self._failed:
+            return
+        self._file.close()
+        self._cache._commit(self._tmp_path, self._key)
+        self._failed = True  # Further writes are ignored
+
+    def abort(self):
+        self._failed = True
+        if self._file:
+            self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+audio_cache = AudioCache(settings.AUDIO_CACHE_DIR, settings.AUDIO_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,158 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import all_models
+from app.schemas import schemas
+from app.services.chat_cache import chat_cache
+from app.services.geo_service import GeoIndex, build_geo_index
+from app.services.retrieval_service import BM25Index, build_passage_index
+from app.services.single_flight import single_flight
+
+# How often a worker asks the database whether another worker changed the catalog
+VERSION_CHECK_SECONDS = 2.0
+
+
+class CatalogSnapshot(NamedTuple):
+    version: int
+    places: Mapping[int, schemas.Place]  # All active places by id
+    top_level: Tuple[schemas.Place, ...]  # Active places without a parent, as listed by /places
+    top_level_summaries: Tuple[schemas.PlaceSummary, ...]  # Same, for /places?view=summary
+    geo: GeoIndex
+    passages: BM25Index  # Text passages of active places for chat grounding
+
+
+def to_place_schema(place: all_models.Place) -> schemas.Place:
+    """
+    Maps a Place row to the public schema (DB latitude/longitude -> location_lat/location_lng).
+    """
+    return schemas.Place(
+        id=place.id,
+        name=place.name,
+        short_desc=place.short_desc,
+        long_desc=place.long_desc,
+        location_lat=place.latitude if place.latitude is not None else 0.0,
+        location_lng=place.longitude if place.longitude is not None else 0.0,
+        type=place.type,
+        photo_url=place.photo_url,
+        boundary_points=place.boundary_points,
+        parent_id=place.parent_id,
+        audio_url=place.audio_url,
+        description=place.description or place.short_desc,
+    )
+
+
+class CatalogService:
+    """
+    Immutable in-memory snapshot of the active place catalog that the public
+    read endpoints serve from. Admin writes bump a version row in the
+    database; every worker compares it against its snapshot at most every
+    VERSION_CHECK_SECONDS and rebuilds when it has changed.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_version(db: Session) -> int:
+        row = db.query(all_models.CatalogVersion.version).filter(all_models.CatalogVersion.id == 1).first()
+        return row.version if row and row.version is not None else 0
+
+    @staticmethod
+    def _build(db: Session, version: int) -> CatalogSnapshot:
+        rows = db.query(all_models.Place).filter(all_models.Place.is_active == True).order_by(all_models.Place.id).all()
+        places = {row.id: to_place_schema(row) for row in rows}
+        top_level = tuple(places[row.id] for row in rows if row.parent_id is None)
+        summaries = tuple(schemas.PlaceSummary(**place.model_dump(include=set(schemas.PlaceSummary.model_fields))) for place in top_level)
+        return CatalogSnapshot(
+            version, MappingProxyType(places), top_level, summaries,
+            build_geo_index(rows), build_passage_index(rows),
+        )
+
+    def _fresh(self) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return snapshot
+        return None
+
+    def _publish(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        # The lock only covers the pointer swap, never a query or a build,
+        # since get_async takes it on the event loop
+        with self._lock:
+            # Never replace a newer snapshot published meanwhile
+            if self._snapshot is None or self._snapshot.version <= snapshot.version:
+                self._snapshot = snapshot
+                self._checked_at = time.monotonic()
+            snapshot = self._snapshot
+        # Cached chat answers may quote passages of the old catalog
+        chat_cache.set_version(snapshot.version)
+        return snapshot
+
+    async def get_async(self, db: AsyncSession) -> CatalogSnapshot:
+        """
+        Current snapshot for the async endpoints. The session is only used
+        when the version is due for a check, and the rebuild (rare) runs
+        through run_sync on the same connection.
+        """
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+        return await self._refresh(db)
+
+    # Requests that find the snapshot due for a check at the same time share
+    # one version query and, if it changed, one rebuild
+    @single_flight(key=lambda self, db: id(self))
+    async def _refresh(self, db: AsyncSession) -> CatalogSnapshot:
+        result = await db.execute(select(all_models.CatalogVersion.version).where(all_models.CatalogVersion.id == 1))
+        version = result.scalar() or 0
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = await db.run_sync(self._build, version)
+        return self._publish(snapshot)
+
+    @staticmethod
+    def ensure_version(db: Session):
+        """
+        Creates the shared version row if it is missing. Called at startup
+        instead of publish_change, so booting a worker doesn't make every
+        running worker rebuild its catalog.
+        """
+        if db.query(all_models.CatalogVersion.id).filter(all_models.CatalogVersion.id == 1).first():
+            return
+        db.add(all_models.CatalogVersion(id=1, version=1))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker booting at the same time created it
+            db.rollback()
+
+    def publish_change(self, db: Session) -> CatalogSnapshot:
+        """
+        Call after an admin commit that touched places: bumps the shared
+        version and swaps in a freshly built snapshot for this worker.
+        """
+        while True:
+            # Increment in SQL so concurrent workers can't lose an update
+            updated = db.query(all_models.CatalogVersion).filter(all_models.CatalogVersion.id == 1).update(
+                {all_models.CatalogVersion.version: all_models.CatalogVersion.version + 1},
+                synchronize_session=False,
+            )
+            if not updated:
+                db.add(all_models.CatalogVersion(id=1, version=1))
+            try:
+                db.commit()
+                break
+            except IntegrityError:
+                # Another worker created the row first; increment that one
+                db.rollback()
+
+        return self._publish(self._build(db, self._read_version(db)))
+
+
+catalog_service = CatalogService()
@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import all_models
+from app.services.retrieval_service import tokenize
+
+# How often a worker looks for purges issued through another worker
+PURGE_CHECK_SECONDS = 2.0
+
+# Function words ignored when comparing questions, so that "how tall" vs
+# "how old" decides a match rather than "is the"
+STOP_WORDS = frozenset("""
+a an the is are was were be been of in on at to for from by with and or it its this that
+do does did can could you your me my we our i about tell please there what which
+bu bir ve mi mı ne için da de
+и в на с о об это что как ли мне
+der die das ist ein eine und zu von mit
+le la les est un une et de du des à
+""".split())
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+def normalize_context(context: Optional[str]) -> str:
+    return " ".join((context or "").lower().split())
+
+
+def content_tokens(query: str) -> FrozenSet[str]:
+    tokens = query.split()
+    content = frozenset(token for token in tokens if token not in STOP_WORDS)
+    return content or frozenset(tokens)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """
+    Jaccard similarity of two token sets.
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ChatCacheEntry:
+    __slots__ = ("query", "tokens", "response", "created_at", "hits")
+
+    def __init__(self, query: str, response: str):
+        self.query = query
+        self.tokens = content_tokens(query)
+        self.response = response
+        self.created_at = time.time()
+        self.hits = 0
+
+
+class ChatCache:
+    """
+    In-memory cache of Gemini chat answers per (place context, language).
+    A question is answered from cache when its normalized text matches a
+    stored one exactly, or when their content words overlap by at least
+    `threshold` (Jaccard), so "How tall is Islam Khoja?" and "how tall is
+    the Islam Khoja minaret" share one answer. Least recently used entries
+    are dropped beyond `max_entries`.
+
+    Answers are grounded on catalog passages, so the cache only holds
+    answers for one catalog version: `set_version` empties it whenever this
+    worker picks up a new catalog snapshot. Every admin change to places
+    bumps that version, which is how the other workers learn about it.
+    Admin purges are written to chat_cache_purges and replayed by each
+    worker on its next `sync`, so a narrow purge stays narrow everywhere.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        # (context, lang, query) -> entry, in LRU order
+        self._entries: "OrderedDict[Tuple[str, str, str], ChatCacheEntry]" = OrderedDict()
+        # (context, lang) -> {query: entry}, the candidates for fuzzy matches
+        self._buckets: Dict[Tuple[str, str], Dict[str, ChatCacheEntry]] = {}
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None  # Catalog version the answers were given for
+        self._purge_seen: Optional[int] = None  # Last chat_cache_purges id applied here
+        self._purge_checked_at = 0.0
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def set_version(self, version: int):
+        with self._lock:
+            if self.version is not None and version != self.version:
+                self._entries.clear()
+                self._buckets.clear()
+            self.version = version
+
+    def _expired(self, entry: ChatCacheEntry) -> bool:
+        return time.time() - entry.created_at >= self.ttl_seconds
+
+    def _remove(self, key: Tuple[str, str, str]):
+        self._entries.pop(key, None)
+        bucket = self._buckets.get(key[:2])
+        if bucket is not None:
+            bucket.pop(key[2], None)
+            if not bucket:
+                del self._buckets[key[:2]]
+
+    def get(self, query: str, context: Optional[str], lang: str) -> Optional[str]:
+        query, context = normalize_query(query), normalize_context(context)
+        with self._lock:
+            key = (context, lang, query)
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self.exact_hits += 1
+            else:
+                tokens = content_tokens(query)
+                best, best_score = None, self.threshold
+                for candidate in self._buckets.get((context, lang), {}).values():
+                    score = similarity(tokens, candidate.tokens)
+                    if score >= best_score and not self._expired(candidate):
+                        best, best_score = candidate, score
+                if best is None:
+                    self.misses += 1
+                    return None
+                entry, key = best, (context, lang, best.query)
+                self.fuzzy_hits += 1
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def put(self, query: str, context: Optional[str], lang: str, response: str, version: Optional[int] = None):
+        """
+        `version` is the catalog version read before the answer was
+        requested; the answer is dropped if the catalog changed meanwhile.
+        """
+        query, context = normalize_query(query), normalize_context(context)
+        if not query or not response:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            key = (context, lang, query)
+            self._remove(key)
+            entry = ChatCacheEntry(query, response)
+            self._entries[key] = entry
+            self._buckets.setdefault((context, lang), {})[query] = entry
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def entries(self, context: Optional[str] = None, lang: Optional[str] = None, limit: int = 100) -> List[dict]:
+        """
+        Most recently used entries first, optionally for one context and/or language.
+        """
+        wanted = normalize_context(context) if context is not None else None
+        with self._lock:
+            items = list(reversed(self._entries.items()))
+        result = []
+        for (entry_context, entry_lang, _), entry in items:
+            if wanted is not None and entry_context != wanted:
+                continue
+            if lang is not None and entry_lang != lang:
+                continue
+            result.append({
+                "context": entry_context,
+                "lang": entry_lang,
+                "query": entry.query,
+                "response": entry.response,
+                "hits": entry.hits,
+                "age_seconds": round(time.time() - entry.created_at, 1),
+            })
+            if len(result) >= limit:
+                break
+        return result
+
+    def purge(self, context: Optional[str] = None, lang: Optional[str] = None, query: Optional[str] = None) -> int:
+        """
+        Drops matching entries (everything if no filter is given).
+        """
+        wanted_context = normalize_context(context) if context is not None else None
+        wanted_query = normalize_query(query) if query is not None else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (wanted_context is None or key[0] == wanted_context)
+                and (lang is None or key[1] == lang)
+                and (wanted_query is None or key[2] == wanted_query)
+            ]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def record_purge(self, db: Session, context: Optional[str] = None, lang: Optional[str] = None, query: Optional[str] = None) -> int:
+        """
+        Purges this worker now and records the purge for the others.
+        Records older than the TTL are dropped, their entries have expired anyway.
+        """
+        deleted = self.purge(context, lang, query)
+        now = time.time()
+        db.query(all_models.ChatCachePurge).filter(all_models.ChatCachePurge.created_at < now - self.ttl_seconds).delete(synchronize_session=False)
+        db.add(all_models.ChatCachePurge(context=context, lang=lang, query=query, created_at=now))
+        db.commit()
+        return deleted
+
+    async def sync(self, db: AsyncSession):
+        """
+        Applies purges recorded since the last call, at most every PURGE_CHECK_SECONDS.
+        """
+        if time.monotonic() - self._purge_checked_at < PURGE_CHECK_SECONDS:
+            return
+        self._purge_checked_at = time.monotonic()
+        table = all_models.ChatCachePurge
+        if self._purge_seen is None:
+            # Nothing cached before this worker's first look; older purges don't apply
+            self._purge_seen = (await db.execute(select(func.max(table.id)))).scalar() or 0
+            return
+        result = await db.execute(select(table).where(table.id > self._purge_seen).order_by(table.id))
+        for purge in result.scalars():
+            self.purge(purge.context, purge.lang, purge.query)
+            self._purge_seen = purge.id
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.fuzzy_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "catalog_version": self.version,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+chat_cache = ChatCache(
+    settings.CHAT_CACHE_MAX_ENTRIES,
+    settings.CHAT_CACHE_TTL_HOURS * 3600,
+    settings.CHAT_CACHE_SIMILARITY,
+)
@@ -0,0 +1,113 @@
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing. After `failure_threshold`
+    consecutive errors (or a single quota error) the circuit opens and calls
+    fail fast with CircuitOpenError. Once the cooldown has passed, up to
+    `half_open_probes` calls are let through; a success closes the circuit,
+    a failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, quota_reset_seconds: float, half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.quota_reset_seconds = quota_reset_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.last_error: Optional[str] = None
+        self._probes_in_flight = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    @staticmethod
+    def is_quota_error(e: Exception) -> bool:
+        return "429" in str(e) or "quota" in str(e).lower()
+
+    def _open(self, cooldown: float):
+        self.state = OPEN
+        self.opened_until = time.monotonic() + cooldown
+        self.times_opened += 1
+
+    def _before(self):
+        if self.state == OPEN:
+            if time.monotonic() < self.opened_until:
+                self.short_circuited += 1
+                raise CircuitOpenError(f"{self.name} circuit open (last error: {self.last_error})")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.short_circuited += 1
+                raise CircuitOpenError(f"{self.name} circuit half-open, probe in flight (last error: {self.last_error})")
+            self._probes_in_flight += 1
+        self.calls += 1
+
+    def _release_probe(self):
+        if self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def _on_success(self):
+        self._release_probe()
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.state = CLOSED
+
+    def _on_failure(self, e: Exception):
+        self._release_probe()
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(e) or type(e).__name__
+        if self.is_quota_error(e):
+            self._open(self.quota_reset_seconds)
+        elif self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open(self.reset_seconds)
+
+    @contextmanager
+    def call(self):
+        """
+        Guards one upstream call. Raises CircuitOpenError without running the
+        body while open; exceptions from the body count as failures, a
+        cancelled call counts as neither.
+        """
+        self._before()
+        try:
+            yield
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        else:
+            self._on_success()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": max(0.0, round(self.opened_until - time.monotonic(), 1)) if self.state == OPEN else 0.0,
+            "last_error": self.last_error,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,360 @@
+import math
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6371 * 1000  # radius of Earth in meters
+METERS_PER_DEGREE_LAT = 111320
+
+# A visitor within this distance of a place is considered "at" the place
+THRESHOLD_METERS = 300
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in meters.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_M * c
+
+
+def haversine_matrix(lats: np.ndarray, lngs: np.ndarray, place_lats: np.ndarray, place_lngs: np.ndarray) -> np.ndarray:
+    """
+    Vectorized haversine: distances in meters between every fix (rows)
+    and every place (columns).
+    """
+    phi1 = np.radians(lats)[:, None]
+    phi2 = np.radians(place_lats)[None, :]
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(place_lngs)[None, :] - np.radians(lngs)[:, None]
+    a = np.sin(delta_phi / 2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_M * c
+
+
+class PlacePoint(NamedTuple):
+    id: int
+    name: str
+    lat: float
+    lng: float
+    type: Optional[str] = None
+
+
+class GridIndex:
+    """
+    Buckets points into fixed-size lat/lng cells so that a radius query only
+    visits the handful of cells overlapping the search circle.
+    """
+
+    def __init__(self, points: Iterable[PlacePoint], cell_meters: float = THRESHOLD_METERS):
+        self.cell_meters = cell_meters
+        self.cell_deg = cell_meters / METERS_PER_DEGREE_LAT
+        self.points: List[PlacePoint] = list(points)
+        self.cells: Dict[Tuple[int, int], List[PlacePoint]] = {}
+        for point in self.points:
+            self.cells.setdefault(self._key(point.lat, point.lng), []).append(point)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _key(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _candidates(self, lat: float, lng: float, radius: float) -> Iterable[PlacePoint]:
+        # Degrees of longitude shrink towards the poles, so widen the lng span accordingly
+        dlat = radius / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(radius / (METERS_PER_DEGREE_LAT * cos_lat), 180.0)
+        row0, col0 = self._key(lat - dlat, lng - dlng)
+        row1, col1 = self._key(lat + dlat, lng + dlng)
+
+        # Large radii would visit more empty cells than there are buckets; scan buckets instead
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.cells):
+            return self.points
+
+        candidates: List[PlacePoint] = []
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = self.cells.get((row, col))
+                if bucket:
+                    candidates.extend(bucket)
+        return candidates
+
+    def within(self, lat: float, lng: float, radius: float) -> List[Tuple[float, PlacePoint]]:
+        """
+        All points within `radius` meters, as (distance, point) sorted by distance.
+        """
+        hits = []
+        for point in self._candidates(lat, lng, radius):
+            dist = haversine(lat, lng, point.lat, point.lng)
+            if dist <= radius:
+                hits.append((dist, point))
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def nearest(self, lat: float, lng: float, max_radius: Optional[float] = None) -> Tuple[Optional[PlacePoint], float]:
+        """
+        Closest point to (lat, lng), searching outward in doubling rings.
+        Returns (None, inf) if nothing lies within `max_radius` (unbounded if None).
+        """
+        if not self.points:
+            return None, float('inf')
+
+        radius = self.cell_meters if max_radius is None else min(self.cell_meters, max_radius)
+        while True:
+            hits = self.within(lat, lng, radius)
+            if hits:
+                return hits[0][1], hits[0][0]
+            if max_radius is not None and radius >= max_radius:
+                return None, float('inf')
+            if radius >= math.pi * EARTH_RADIUS_M:
+                return None, float('inf')
+            radius *= 2
+            if max_radius is not None:
+                radius = min(radius, max_radius)
+
+    def k_nearest(self, lat: float, lng: float, k: int, max_radius: float, types: Optional[Collection[str]] = None) -> List[Tuple[float, PlacePoint]]:
+        """
+        Up to `k` closest points within `max_radius` meters, optionally limited
+        to the given place types. The search ring grows from one cell until it
+        holds `k` matches, so cost depends on local density, not catalog size.
+        """
+        radius = min(self.cell_meters, max_radius)
+        while True:
+            hits = self.within(lat, lng, radius)
+            if types:
+                hits = [hit for hit in hits if hit[1].type in types]
+            if len(hits) >= k or radius >= max_radius:
+                return hits[:k]
+            radius = min(radius * 2, max_radius)
+
+    # Keeps the fixes x places distance matrix around a few million cells
+    BATCH_CELLS = 2_000_000
+
+    def nearest_many(self, lats: Sequence[float], lngs: Sequence[float]) -> Tuple[List[Optional[PlacePoint]], np.ndarray]:
+        """
+        Closest point for each fix, computed with one distance matrix per chunk
+        of fixes instead of one grid search per fix.
+        """
+        if not self.points:
+            return [None] * len(lats), np.full(len(lats), np.inf)
+
+        place_lats = np.array([point.lat for point in self.points], dtype=float)
+        place_lngs = np.array([point.lng for point in self.points], dtype=float)
+        fix_lats = np.asarray(lats, dtype=float)
+        fix_lngs = np.asarray(lngs, dtype=float)
+
+        chunk = max(1, self.BATCH_CELLS // len(self.points))
+        nearest_idx = np.empty(len(fix_lats), dtype=int)
+        nearest_dist = np.empty(len(fix_lats), dtype=float)
+        for start in range(0, len(fix_lats), chunk):
+            dists = haversine_matrix(fix_lats[start:start + chunk], fix_lngs[start:start + chunk], place_lats, place_lngs)
+            idx = dists.argmin(axis=1)
+            nearest_idx[start:start + chunk] = idx
+            nearest_dist[start:start + chunk] = dists[np.arange(len(idx)), idx]
+        return [self.points[i] for i in nearest_idx], nearest_dist
+
+
+class Geofence(NamedTuple):
+    point: PlacePoint
+    depth: int  # 0 for top-level places, +1 per parent_id hop
+    area: float  # in square degrees, only used to rank overlapping fences
+    min_lat: float
+    min_lng: float
+    max_lat: float
+    max_lng: float
+    lats: Tuple[float, ...]
+    lngs: Tuple[float, ...]
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if lat < self.min_lat or lat > self.max_lat or lng < self.min_lng or lng > self.max_lng:
+            return False
+        return point_in_polygon(lat, lng, self.lats, self.lngs)
+
+
+def point_in_polygon(lat: float, lng: float, lats: Tuple[float, ...], lngs: Tuple[float, ...]) -> bool:
+    """
+    Ray casting test. Polygons are small enough that lat/lng can be treated as planar.
+    """
+    inside = False
+    j = len(lats) - 1
+    for i in range(len(lats)):
+        lat_i, lat_j = lats[i], lats[j]
+        if (lat_i > lat) != (lat_j > lat):
+            lng_cross = lngs[i] + (lat - lat_i) * (lngs[j] - lngs[i]) / (lat_j - lat_i)
+            if lng < lng_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def parse_boundary(boundary_points) -> Optional[Tuple[Tuple[float, ...], Tuple[float, ...]]]:
+    """
+    Converts Place.boundary_points ([{lat, lng}, ...]) into parallel lat/lng tuples.
+    Returns None if there are fewer than 3 usable vertices.
+    """
+    if not boundary_points:
+        return None
+    lats, lngs = [], []
+    for vertex in boundary_points:
+        try:
+            if isinstance(vertex, dict):
+                lat, lng = float(vertex["lat"]), float(vertex["lng"])
+            else:
+                lat, lng = float(vertex[0]), float(vertex[1])
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        lats.append(lat)
+        lngs.append(lng)
+    if len(lats) < 3:
+        return None
+    return tuple(lats), tuple(lngs)
+
+
+class GeofenceIndex:
+    """
+    Polygon lookup: fences are bucketed by bounding box into grid cells, so a
+    fix only runs the point-in-polygon test on fences whose bbox covers its cell.
+    """
+
+    # Fences spanning more cells than this are kept in a short list checked on every lookup
+    MAX_CELLS_PER_FENCE = 64
+
+    def __init__(self, fences: Iterable[Geofence], cell_meters: float = THRESHOLD_METERS):
+        self.cell_deg = cell_meters / METERS_PER_DEGREE_LAT
+        self.fences: List[Geofence] = list(fences)
+        self.cells: Dict[Tuple[int, int], List[Geofence]] = {}
+        self.oversized: List[Geofence] = []
+        for fence in self.fences:
+            row0, col0 = self._key(fence.min_lat, fence.min_lng)
+            row1, col1 = self._key(fence.max_lat, fence.max_lng)
+            if (row1 - row0 + 1) * (col1 - col0 + 1) > self.MAX_CELLS_PER_FENCE:
+                self.oversized.append(fence)
+                continue
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    self.cells.setdefault((row, col), []).append(fence)
+
+    def __len__(self) -> int:
+        return len(self.fences)
+
+    def _key(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def containing(self, lat: float, lng: float) -> List[Geofence]:
+        candidates = self.cells.get(self._key(lat, lng), [])
+        if self.oversized:
+            candidates = candidates + self.oversized
+        return [fence for fence in candidates if fence.contains(lat, lng)]
+
+    def deepest(self, lat: float, lng: float) -> Optional[Geofence]:
+        """
+        Innermost fence containing the point, e.g. a room inside Kunta Ark
+        rather than the citadel itself. Ties go to the smaller polygon.
+        """
+        best = None
+        for fence in self.containing(lat, lng):
+            if best is None or (fence.depth, -fence.area) > (best.depth, -best.area):
+                best = fence
+        return best
+
+
+class GeoIndex(NamedTuple):
+    points: GridIndex
+    fences: GeofenceIndex
+
+
+def build_geo_index(places: Iterable) -> GeoIndex:
+    """
+    Builds the centroid grid and geofence index from active places
+    (anything with id, name, latitude, longitude, boundary_points, parent_id).
+    """
+    places = list(places)
+    parents = {place.id: place.parent_id for place in places}
+
+    def depth_of(place_id):
+        depth, seen = 0, {place_id}
+        parent_id = parents.get(place_id)
+        while parent_id is not None and parent_id in parents and parent_id not in seen:
+            seen.add(parent_id)
+            depth += 1
+            parent_id = parents.get(parent_id)
+        return depth
+
+    points, fences = [], []
+    for place in places:
+        place_id, name, lat, lng = place.id, place.name, place.latitude, place.longitude
+        point = None
+        # Skip if place has no valid coordinates
+        if lat is not None and lng is not None:
+            try:
+                point = PlacePoint(place_id, name, float(lat), float(lng), place.type)
+                points.append(point)
+            except (TypeError, ValueError) as e:
+                print(f"Error indexing coordinates for {name}: {e}")
+
+        polygon = parse_boundary(place.boundary_points)
+        if not polygon:
+            continue
+        lats, lngs = polygon
+        if point is None:
+            point = PlacePoint(place_id, name, sum(lats) / len(lats), sum(lngs) / len(lngs), place.type)
+        area = abs(sum(
+            lngs[i] * lats[i - 1] - lngs[i - 1] * lats[i] for i in range(len(lats))
+        )) / 2
+        fences.append(Geofence(
+            point, depth_of(place_id), area,
+            min(lats), min(lngs), max(lats), max(lngs), lats, lngs,
+        ))
+    return GeoIndex(GridIndex(points), GeofenceIndex(fences))
+
+
+class GeoService:
+    """
+    Place lookups against a spatial index, normally the `geo` index of the
+    current catalog snapshot.
+    """
+
+    def find_nearest(self, index: GeoIndex, lat: float, lng: float) -> Tuple[Optional[PlacePoint], float]:
+        """
+        Closest active place centroid to the given fix, regardless of distance.
+        """
+        return index.points.nearest(lat, lng)
+
+    def nearby(self, index: GeoIndex, lat: float, lng: float, k: int, max_radius: float, types: Optional[Collection[str]] = None) -> List[Tuple[float, PlacePoint]]:
+        """
+        The `k` closest active places within `max_radius` meters, sorted by distance.
+        """
+        return index.points.k_nearest(lat, lng, k, max_radius, types)
+
+    def locate(self, index: GeoIndex, lat: float, lng: float) -> Tuple[Optional[PlacePoint], float]:
+        """
+        Place the visitor is at: the deepest boundary polygon containing the fix
+        (distance 0), otherwise the closest centroid and its distance.
+        """
+        fence = index.fences.deepest(lat, lng)
+        if fence:
+            return fence.point, 0.0
+        return index.points.nearest(lat, lng)
+
+    def locate_many(self, index: GeoIndex, lats: Sequence[float], lngs: Sequence[float]) -> List[Tuple[Optional[PlacePoint], float]]:
+        """
+        Batch version of `locate` for replaying recorded tracks. Applies the
+        same rules: deepest geofence first, otherwise the closest centroid.
+        """
+        points, dists = index.points.nearest_many(lats, lngs)
+        results = []
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            fence = index.fences.deepest(lat, lng)
+            if fence:
+                results.append((fence.point, 0.0))
+            else:
+                results.append((points[i], float(dists[i])))
+        return results
+
+
+geo_service = GeoService()
@@ -0,0 +1,188 @@
+import re
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, run_write
+from app.models import all_models
+from app.schemas import schemas
+from app.services.retrieval_service import split_passages
+from app.services.translation_service import text_hash, translation_service
+
+# Place columns kept translated in every narration language: exactly the
+# texts `localize` serves, since every translated piece costs MyMemory quota
+TRANSLATED_FIELDS = ("short_desc", "description", "long_desc")
+
+# MyMemory rejects queries over 500 bytes, so longer texts go up in pieces
+TRANSLATE_CHUNK_CHARS = 450
+TRANSLATE_MAX_BYTES = 500
+
+
+def hard_split(text: str, max_bytes: int = TRANSLATE_MAX_BYTES) -> List[str]:
+    """
+    Cuts a piece at word boundaries so that each part stays within
+    `max_bytes` of UTF-8; a single word longer than that is cut as well.
+    """
+    if len(text.encode("utf-8")) <= max_bytes:
+        return [text]
+    parts = []
+    current = ""
+    for word in text.split():
+        while len(word.encode("utf-8")) > max_bytes:
+            if current:
+                parts.append(current)
+                current = ""
+            cut = max_bytes
+            while len(word[:cut].encode("utf-8")) > max_bytes:
+                cut -= 1
+            parts.append(word[:cut])
+            word = word[cut:]
+        candidate = f"{current} {word}" if current else word
+        if current and len(candidate.encode("utf-8")) > max_bytes:
+            parts.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+class PlaceTranslationService:
+    """
+    Store of place texts translated ahead of time into each narration
+    language. The pre-render pipeline calls `sync_place` whenever a place
+    is queued; it retranslates only fields whose source text hash changed.
+    Request handlers read a place's translations for one language with a
+    single indexed query and never translate on the request path.
+    """
+
+    def __init__(self):
+        self.translated = 0
+        self.failed = 0
+
+    @staticmethod
+    async def get(db: AsyncSession, place_id: int, lang: str) -> Dict[str, str]:
+        """
+        Translated fields of a place for `lang`; empty for the content language.
+        """
+        if lang == settings.CONTENT_LANG:
+            return {}
+        result = await db.execute(
+            select(all_models.PlaceTranslation.field, all_models.PlaceTranslation.text).where(
+                all_models.PlaceTranslation.place_id == place_id,
+                all_models.PlaceTranslation.lang == lang,
+            )
+        )
+        return {row.field: row.text for row in result if row.text}
+
+    @staticmethod
+    def localize(place: schemas.Place, translations: Dict[str, str]) -> schemas.Place:
+        """
+        Copy of a catalog place with its texts replaced by the given translations.
+        Fields without a translation (yet) keep the original text.
+        """
+        update = {}
+        if "short_desc" in translations:
+            update["short_desc"] = translations["short_desc"]
+        if "long_desc" in translations:
+            update["long_desc"] = translations["long_desc"]
+        if "description" in translations:
+            update["description"] = translations["description"]
+        elif "short_desc" in translations and place.description == place.short_desc:
+            # The public description falls back to short_desc, so its translation does too
+            update["description"] = translations["short_desc"]
+        return place.model_copy(update=update) if update else place
+
+    async def get_place(self, db: AsyncSession, place: schemas.Place, lang: str) -> schemas.Place:
+        return self.localize(place, await self.get(db, place.id, lang))
+
+    @staticmethod
+    async def _translate_text(text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        # Translate paragraph by paragraph so the breaks survive
+        paragraphs = [paragraph for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+        # split_passages keeps whole sentences, so one sentence may still be too long
+        pieces = [
+            [part for passage in split_passages(paragraph, TRANSLATE_CHUNK_CHARS) for part in hard_split(passage)]
+            for paragraph in paragraphs
+        ]
+        translated = await translation_service.translate_all(
+            [piece for paragraph in pieces for piece in paragraph], source_lang, target_lang
+        )
+        if not translated or any(result is None for result in translated):
+            return None
+
+        result: List[str] = []
+        position = 0
+        for paragraph in pieces:
+            result.append(" ".join(translated[position:position + len(paragraph)]))
+            position += len(paragraph)
+        return "\n\n".join(result)
+
+    async def sync_place(self, place_id: int, langs: Iterable[str]):
+        """
+        Brings the stored translations of one place up to date with its
+        current texts. A field that fails to translate is left as it was
+        and retried the next time the place is queued.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(*(getattr(all_models.Place, field) for field in TRANSLATED_FIELDS)).where(all_models.Place.id == place_id)
+            )
+            place = result.first()
+            if not place:
+                return
+            sources = dict(zip(TRANSLATED_FIELDS, place))
+            result = await db.execute(
+                select(all_models.PlaceTranslation.lang, all_models.PlaceTranslation.field, all_models.PlaceTranslation.source_hash).where(
+                    all_models.PlaceTranslation.place_id == place_id
+                )
+            )
+            stored = {(row.lang, row.field): row.source_hash for row in result}
+
+        for lang in langs:
+            if lang == settings.CONTENT_LANG:
+                continue
+            for field, source in sources.items():
+                source_hash = text_hash(source) if source and source.strip() else None
+                if stored.get((lang, field)) == source_hash:
+                    continue
+                translated = None
+                if source_hash:
+                    translated = await self._translate_text(source, settings.CONTENT_LANG, lang)
+                    if translated is None:
+                        self.failed += 1
+                        continue
+                    self.translated += 1
+                await run_write(self._store, place_id, lang, field, translated, source_hash)
+
+    @staticmethod
+    def _store(db: Session, place_id: int, lang: str, field: str, text: Optional[str], source_hash: Optional[str]):
+        row = db.execute(
+            select(all_models.PlaceTranslation).where(
+                all_models.PlaceTranslation.place_id == place_id,
+                all_models.PlaceTranslation.lang == lang,
+                all_models.PlaceTranslation.field == field,
+            )
+        ).scalars().first()
+        if text is None:
+            # The source field was cleared
+            if row:
+                db.delete(row)
+        else:
+            if not row:
+                row = all_models.PlaceTranslation(place_id=place_id, lang=lang, field=field)
+                db.add(row)
+            row.text = text
+            row.source_hash = source_hash
+        db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "translated": self.translated,
+            "failed": self.failed,
+        }
+
+
+place_translation_service = PlaceTranslationService()
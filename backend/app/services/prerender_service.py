@@ -0,0 +1,176 @@
+import asyncio
+import time
+from typing import Optional, Set
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models import all_models
+from app.schemas import schemas
+from app.services.ai_service import ai_service, VOICES
+from app.services.catalog_service import catalog_service
+from app.services.place_translation_service import place_translation_service
+from app.services.tts_scheduler import TTSQueueFullError, PRIORITY_BACKGROUND
+from app.services.welcome_service import welcome_service
+
+NARRATION_LANGS = tuple(VOICES)
+NARRATION_MODES = ("short", "long")
+
+
+def narration_text(place: schemas.Place, mode: str = "short") -> str:
+    """
+    Text read aloud by /places/{id}/audio for a narration mode.
+    """
+    text = place.description if mode == "long" else place.short_desc
+    return text or place.name
+
+
+def intro_fallback(place: schemas.Place, localized: schemas.Place) -> Optional[str]:
+    """
+    Welcome text used when Gemini has none: the translated short description,
+    if there is one, instead of the English FALLBACK_DATA.
+    """
+    if localized is not place and localized.short_desc != place.short_desc:
+        return localized.short_desc
+    return None
+
+
+class PrerenderService:
+    """
+    Background pipeline that brings a place's stored translations up to
+    date, then synthesizes its narration in all languages and modes ahead
+    of time, so /places/{id}/audio is served straight from the audio cache.
+    It also warms the welcome message cache and intro audio used by
+    /places/{id}/intro. A fixed number of workers drain a queue
+    of place ids; a place already waiting in the queue isn't queued twice.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[int] = set()
+        self._workers = []
+        self.rendered = 0
+        self.failed = 0
+
+    def start(self, workers: int = settings.PRERENDER_WORKERS):
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, workers))]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue_place(self, place_id: int):
+        """
+        Schedule a place for rendering. Safe to call from sync endpoints running in the threadpool.
+        """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._put, place_id)
+
+    def enqueue_all(self):
+        """
+        Schedule every active place. Reads the catalog on the event loop, so
+        admin endpoints holding the single writer connection can call it.
+        """
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._enqueue_all()))
+
+    async def _enqueue_all(self):
+        async with AsyncSessionLocal() as db:
+            place_ids = list((await catalog_service.get_async(db)).places)
+        for place_id in place_ids:
+            self._put(place_id)
+
+    def _put(self, place_id: int):
+        if place_id in self._pending:
+            return
+        self._pending.add(place_id)
+        self._queue.put_nowait(place_id)
+
+    async def _worker(self):
+        while True:
+            place_id = await self._queue.get()
+            self._pending.discard(place_id)
+            try:
+                await self._render_place(place_id)
+            except Exception as e:
+                print(f"Pre-render failed for place {place_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _render_place(self, place_id: int):
+        async with AsyncSessionLocal() as db:
+            place = (await catalog_service.get_async(db)).places.get(place_id)
+        if not place:
+            return
+
+        await place_translation_service.sync_place(place_id, NARRATION_LANGS)
+
+        for lang in NARRATION_LANGS:
+            async with AsyncSessionLocal() as db:
+                localized = await place_translation_service.get_place(db, place, lang)
+            for mode in NARRATION_MODES:
+                text = narration_text(localized, mode)
+                mp3_fp = await self._generate(text, lang, mode)
+                if not mp3_fp:
+                    self.failed += 1
+                    continue
+                self.rendered += 1
+
+            intro_text = await welcome_service.get_message(place.name, lang, intro_fallback(place, localized))
+            await self._generate(intro_text, lang, "short")
+
+    @staticmethod
+    async def _generate(text: str, lang: str, mode: str):
+        # Same synthesis path as /places/{id}/audio, so the endpoint finds the cached chunks
+        generate = ai_service.generate_narration if mode == "long" else ai_service.generate_audio_guide
+        # Background work backs off instead of failing when users fill the TTS queue
+        while True:
+            try:
+                return await generate(text, lang, priority=PRIORITY_BACKGROUND)
+            except TTSQueueFullError as e:
+                await asyncio.sleep(e.retry_after)
+
+    @staticmethod
+    def claim_startup_run(db: Session) -> bool:
+        """
+        True for the one worker that should queue the startup pre-render;
+        the others find the lease taken within PRERENDER_STARTUP_LEASE_SECONDS.
+        """
+        now = time.time()
+        lease = all_models.JobLease
+        claimed = db.query(lease).filter(
+            lease.name == "prerender_startup",
+            lease.claimed_at < now - settings.PRERENDER_STARTUP_LEASE_SECONDS,
+        ).update({lease.claimed_at: now}, synchronize_session=False)
+        if not claimed:
+            if db.query(lease.name).filter(lease.name == "prerender_startup").first():
+                db.rollback()
+                return False
+            db.add(lease(name="prerender_startup", claimed_at=now))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker booting at the same time took it
+            db.rollback()
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._workers),
+            "rendered": self.rendered,
+            "failed": self.failed,
+        }
+
+
+prerender_service = PrerenderService()
@@ -0,0 +1,95 @@
+import time
+from typing import List, Optional
+from app.services.geo_service import GeoIndex, geo_service, haversine, PlacePoint, THRESHOLD_METERS
+
+# A visitor enters a place within THRESHOLD_METERS but only leaves it beyond EXIT_METERS,
+# so GPS jitter around the boundary doesn't toggle the place on and off.
+ENTER_METERS = THRESHOLD_METERS
+EXIT_METERS = THRESHOLD_METERS + 50
+
+# Between two neighbouring places the visitor stays with the current one until
+# the other is closer by SWITCH_MARGIN_METERS, so walking the line between two
+# monuments doesn't swap the place after every dwell period.
+SWITCH_MARGIN_METERS = 50
+
+# A change of place must hold for this long before it is reported. The first
+# fix of a session is reported at once, so the camera scan needs no waiting.
+DWELL_SECONDS = 5.0
+
+
+class ProximitySession:
+    """
+    Per-connection state for a streamed GPS track. Feed it fixes with
+    `update`; it returns only the enter/exit events caused by that fix.
+    """
+
+    def __init__(
+        self,
+        enter_meters: float = ENTER_METERS,
+        exit_meters: float = EXIT_METERS,
+        switch_margin_meters: float = SWITCH_MARGIN_METERS,
+        dwell_seconds: float = DWELL_SECONDS,
+    ):
+        self.enter_meters = enter_meters
+        self.exit_meters = exit_meters
+        self.switch_margin_meters = switch_margin_meters
+        self.dwell_seconds = dwell_seconds
+        self.current: Optional[PlacePoint] = None
+        self._pending: Optional[PlacePoint] = None
+        self._pending_since: Optional[float] = None
+        self.fixes = 0
+
+    def _target(self, lat: float, lng: float, located: Optional[PlacePoint], dist: float) -> Optional[PlacePoint]:
+        current = self.current
+        current_dist = haversine(lat, lng, current.lat, current.lng) if current is not None else None
+        if located:
+            staying = current is not None and located.id == current.id
+            if staying and dist <= self.exit_meters:
+                return located
+            if not staying and dist <= self.enter_meters:
+                # A neighbour only takes over once it is clearly closer than the current place
+                if current_dist is None or current_dist > self.exit_meters or dist + self.switch_margin_meters < current_dist:
+                    return located
+                return current
+        # Nearest place is elsewhere but we haven't left the hysteresis band of the current one yet
+        if current_dist is not None and current_dist <= self.exit_meters:
+            return current
+        return None
+
+    def update(self, index: GeoIndex, lat: float, lng: float, timestamp: Optional[float] = None) -> List[dict]:
+        if timestamp is None:
+            timestamp = time.time()
+        self.fixes += 1
+
+        located, dist = geo_service.locate(index, lat, lng)
+        target = self._target(lat, lng, located, dist)
+        target_id = target.id if target else None
+        current_id = self.current.id if self.current else None
+
+        if target_id == current_id:
+            self._pending = None
+            self._pending_since = None
+            return []
+
+        pending_id = self._pending.id if self._pending else None
+        if self._pending_since is None or pending_id != target_id:
+            self._pending = target
+            self._pending_since = timestamp
+
+        if self.fixes > 1 and timestamp - self._pending_since < self.dwell_seconds:
+            return []
+
+        events = []
+        if self.current:
+            events.append({"event": "exit", "place_id": self.current.id, "place_name": self.current.name})
+        if target:
+            events.append({
+                "event": "enter",
+                "place_id": target.id,
+                "place_name": target.name,
+                "distance_m": round(dist, 1) if located and located.id == target.id else None,
+            })
+        self.current = target
+        self._pending = None
+        self._pending_since = None
+        return events
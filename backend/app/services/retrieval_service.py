@@ -0,0 +1,140 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from app.services.catalog_service import CatalogSnapshot
+
+# Place text columns that are searched, in the order passages are cut from them
+PASSAGE_FIELDS = ("story_text", "long_desc", "child_text", "description")
+
+# Passages are packed from whole sentences up to roughly this length
+PASSAGE_CHARS = 500
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.lower()) if len(token) > 1 or token.isdigit()]
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS) -> List[str]:
+    """
+    Cuts a text into passages of whole sentences, at most `max_chars` long
+    unless a single sentence is longer. Paragraph breaks always end a passage.
+    """
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        current = ""
+        for sentence in SENTENCE_END.split(" ".join(paragraph.split())):
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+
+class Passage(NamedTuple):
+    place_id: int
+    place_name: str
+    field: str
+    text: str
+
+
+class BM25Index:
+    """
+    Inverted index over place passages ranked with Okapi BM25. Built once
+    per catalog snapshot and read-only afterwards.
+    """
+
+    def __init__(self, passages: Iterable[Passage], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Passage] = list(passages)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for doc, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage.text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(self.passages)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 3, place_ids: Optional[Sequence[int]] = None, boost: float = 1.0) -> List[Tuple[Passage, float]]:
+        """
+        Top `k` passages for the query, best first. Passages belonging to
+        `place_ids` have their score multiplied by `boost`.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / self.avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if place_ids and boost != 1.0:
+            favoured = set(place_ids)
+            for doc in scores:
+                if self.passages[doc].place_id in favoured:
+                    scores[doc] *= boost
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.passages[doc], score) for doc, score in best]
+
+
+def build_passage_index(places) -> BM25Index:
+    """
+    Index the text columns of Place rows, skipping passages repeated across
+    fields of the same place (e.g. description copied from long_desc).
+    """
+    passages = []
+    for place in places:
+        seen = set()
+        for field in PASSAGE_FIELDS:
+            for chunk in split_passages(getattr(place, field, None)):
+                if chunk not in seen:
+                    seen.add(chunk)
+                    passages.append(Passage(place.id, place.name, field, chunk))
+    return BM25Index(passages)
+
+
+class RetrievalService:
+    """
+    Picks the few catalog passages most relevant to a chat question so the
+    prompt carries facts from our own texts instead of whole stories.
+    """
+
+    # Passages of the place the user is at rank this much higher
+    CONTEXT_BOOST = 1.5
+
+    def search(self, snapshot: "CatalogSnapshot", query: str, context: Optional[str] = None, k: int = 3) -> List[Passage]:
+        place_ids = []
+        if context:
+            wanted = context.strip().lower()
+            place_ids = [place.id for place in snapshot.places.values() if place.name and place.name.strip().lower() == wanted]
+
+        # The place name carries meaning for questions like "when was it built?"
+        hits = snapshot.passages.search(f"{query} {context or ''}", k, place_ids, self.CONTEXT_BOOST)
+        return [passage for passage, _ in hits]
+
+
+retrieval_service = RetrievalService()
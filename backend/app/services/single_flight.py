@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+
+def _default_key(signature: inspect.Signature) -> Callable[..., Any]:
+    def key(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.items())
+    return key
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+
+
+def single_flight(key: Optional[Callable[..., Any]] = None):
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    coroutine, everyone who arrives while it is in flight waits for and gets
+    the same result (or exception). Nothing is cached once the call finishes.
+
+    `key` receives the call's arguments; by default all arguments, with
+    defaults applied, form the key. The shared call is cancelled once every
+    waiter has been cancelled (e.g. all clients disconnected).
+    """
+    def decorator(func):
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError("single_flight wraps coroutine functions; use single_flight_stream for async generators")
+        key_func = key or _default_key(inspect.signature(func))
+        in_flight: Dict[Any, _Flight] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = (id(asyncio.get_running_loop()), key_func(*args, **kwargs))
+            flight = in_flight.get(call_key)
+            if flight is None:
+                flight = in_flight[call_key] = _Flight(asyncio.ensure_future(func(*args, **kwargs)))
+                flight.task.add_done_callback(lambda _: in_flight.pop(call_key, None))
+            else:
+                wrapper.coalesced += 1
+
+            flight.waiters += 1
+            try:
+                # A cancelled waiter must not cancel the shared call for the others
+                return await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if flight.waiters == 1 and not flight.task.done():
+                    flight.task.cancel()
+                raise
+            finally:
+                flight.waiters -= 1
+
+        wrapper.coalesced = 0
+        return wrapper
+
+    return decorator
+
+
+def single_flight_stream(key: Optional[Callable[..., Any]] = None):
+    """
+    single_flight for async generators: one shared run of the generator per
+    key, and every concurrent caller receives all of its items from the
+    first one on, as they are produced. The items are kept in memory until
+    the run ends, so this suits short streams such as one audio clip.
+    The shared run is cancelled once every caller has stopped iterating.
+    """
+    def decorator(func):
+        if not inspect.isasyncgenfunction(func):
+            raise TypeError("single_flight_stream wraps async generator functions")
+        key_func = key or _default_key(inspect.signature(func))
+        in_flight: Dict[Any, _StreamFlight] = {}
+
+        async def pump(flight: _StreamFlight, args, kwargs):
+            try:
+                async for item in func(*args, **kwargs):
+                    async with flight.changed:
+                        flight.items.append(item)
+                        flight.changed.notify_all()
+            except asyncio.CancelledError:
+                # Only happens when nobody is listening any more, or at shutdown
+                flight.error = RuntimeError("Shared stream was cancelled")
+                raise
+            except Exception as e:
+                flight.error = e
+            finally:
+                flight.done = True
+                async with flight.changed:
+                    flight.changed.notify_all()
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> AsyncIterator[Any]:
+            call_key = (id(asyncio.get_running_loop()), key_func(*args, **kwargs))
+            flight = in_flight.get(call_key)
+            if flight is None:
+                flight = in_flight[call_key] = _StreamFlight()
+                flight.task = asyncio.ensure_future(pump(flight, args, kwargs))
+                flight.task.add_done_callback(lambda _: in_flight.pop(call_key, None))
+            else:
+                wrapper.coalesced += 1
+
+            flight.subscribers += 1
+            try:
+                position = 0
+                while True:
+                    async with flight.changed:
+                        await flight.changed.wait_for(lambda: position < len(flight.items) or flight.done)
+                    while position < len(flight.items):
+                        yield flight.items[position]
+                        position += 1
+                    if flight.done:
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+            finally:
+                flight.subscribers -= 1
+                if not flight.subscribers and not flight.task.done():
+                    flight.task.cancel()
+
+        wrapper.coalesced = 0
+        return wrapper
+
+    return decorator
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import httpx
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, run_write
+from app.models import all_models
+from app.schemas import schemas
+from app.services.single_flight import single_flight
+
+TranslationKey = Tuple[str, str, str]  # (text, source_lang, target_lang)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationService:
+    """
+    Translates through the MyMemory API with one pooled, keep-alive async
+    client, behind two cache tiers: an in-memory LRU in front of the
+    persistent `translations` table. Only real upstream translations are
+    cached; the "[lang] text" fallback is not.
+    """
+
+    def __init__(self, memory_entries: int):
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[TranslationKey, str]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.upstream_errors = 0
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=settings.TRANSLATE_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.TRANSLATE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.TRANSLATE_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- Cache tiers ---
+
+    def _memory_get(self, key: TranslationKey) -> Optional[str]:
+        with self._memory_lock:
+            translated = self._memory.get(key)
+            if translated is not None:
+                self._memory.move_to_end(key)
+            return translated
+
+    def _memory_put(self, key: TranslationKey, translated: str):
+        with self._memory_lock:
+            self._memory[key] = translated
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    async def _db_get(key: TranslationKey) -> Optional[str]:
+        text, source_lang, target_lang = key
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(all_models.Translation.text, all_models.Translation.translated).where(
+                    all_models.Translation.text_hash == text_hash(text),
+                    all_models.Translation.source_lang == source_lang,
+                    all_models.Translation.target_lang == target_lang,
+                )
+            )
+            row = result.first()
+        # The hash only narrows the lookup; compare the text itself too
+        return row.translated if row and row.text == text else None
+
+    @staticmethod
+    async def _db_get_many(texts: Sequence[str], source_lang: str, target_lang: str) -> Dict[str, str]:
+        hashes = {text_hash(text): text for text in texts}
+        found = {}
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(all_models.Translation.text, all_models.Translation.translated).where(
+                    all_models.Translation.text_hash.in_(list(hashes)),
+                    all_models.Translation.source_lang == source_lang,
+                    all_models.Translation.target_lang == target_lang,
+                )
+            )
+            rows = result.all()
+        for row in rows:
+            if row.text in texts:
+                found[row.text] = row.translated
+        return found
+
+    @staticmethod
+    def _db_put(db: Session, key: TranslationKey, translated: str):
+        text, source_lang, target_lang = key
+        db.add(all_models.Translation(
+            text_hash=text_hash(text),
+            source_lang=source_lang,
+            target_lang=target_lang,
+            text=text,
+            translated=translated,
+            created_at=time.time(),
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request or worker stored it first
+            db.rollback()
+
+    async def cached(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """
+        Translation from the memory or database tier, or None.
+        """
+        key = (text, source_lang, target_lang)
+        translated = self._memory_get(key)
+        if translated is not None:
+            self.memory_hits += 1
+            return translated
+        translated = await self._db_get(key)
+        if translated is not None:
+            self.db_hits += 1
+            self._memory_put(key, translated)
+        return translated
+
+    # --- Upstream ---
+
+    @single_flight()
+    async def _fetch(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        try:
+            response = await self.client().get(
+                settings.TRANSLATE_API_URL,
+                params={"q": text, "langpair": f"{source_lang}|{target_lang}"},
+            )
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            self.upstream_errors += 1
+            print(f"MyMemory API Failed: {str(e) or type(e).__name__}")
+            return None
+
+        translated = (data.get("responseData") or {}).get("translatedText")
+        if not translated:
+            return None
+        # MyMemory reports quota and length errors in translatedText itself with a
+        # non-200 responseStatus; that text is an error message, not a translation
+        if str(data.get("responseStatus", 200)) != "200":
+            self.upstream_errors += 1
+            print(f"MyMemory API Failed: {data.get('responseStatus')} {translated}")
+            return None
+        key = (text, source_lang, target_lang)
+        self._memory_put(key, translated)
+        await run_write(self._db_put, key, translated)
+        return translated
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> schemas.TranslationResponse:
+        translated = await self.cached(text, source_lang, target_lang)
+        if translated is None:
+            self.misses += 1
+            translated = await self._fetch(text, source_lang, target_lang)
+
+        # Ultimate Fallback if API fails
+        return schemas.TranslationResponse(
+            original=text,
+            translated=translated or f"[{target_lang}] {text}"
+        )
+
+    async def translate_all(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[Optional[str]]:
+        """
+        Translates a list of texts with one language pair, in input order,
+        with None where the upstream failed. Duplicates are translated once,
+        cached texts are looked up in one pass per tier, and at most
+        TRANSLATE_BATCH_CONCURRENCY misses are fetched at a time.
+        """
+        unique = list(dict.fromkeys(texts))
+        translations: Dict[str, Optional[str]] = {}
+
+        remaining = []
+        for text in unique:
+            translated = self._memory_get((text, source_lang, target_lang))
+            if translated is not None:
+                self.memory_hits += 1
+                translations[text] = translated
+            else:
+                remaining.append(text)
+
+        if remaining:
+            for text, translated in (await self._db_get_many(remaining, source_lang, target_lang)).items():
+                self.db_hits += 1
+                self._memory_put((text, source_lang, target_lang), translated)
+                translations[text] = translated
+            remaining = [text for text in remaining if text not in translations]
+
+        if remaining:
+            self.misses += len(remaining)
+            limit = asyncio.Semaphore(settings.TRANSLATE_BATCH_CONCURRENCY)
+
+            async def fetch(text: str) -> Optional[str]:
+                async with limit:
+                    return await self._fetch(text, source_lang, target_lang)
+
+            fetched = await asyncio.gather(*(fetch(text) for text in remaining))
+            translations.update(zip(remaining, fetched))
+
+        return [translations[text] for text in texts]
+
+    async def translate_many(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[schemas.TranslationResponse]:
+        translated = await self.translate_all(texts, source_lang, target_lang)
+        return [
+            schemas.TranslationResponse(original=text, translated=result or f"[{target_lang}] {text}")
+            for text, result in zip(texts, translated)
+        ]
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "upstream_errors": self.upstream_errors,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+translation_service = TranslationService(settings.TRANSLATE_MEMORY_CACHE_SIZE)
@@ -0,0 +1,113 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+from app.core.config import settings
+
+# Lower runs first: a visitor waiting on an intro beats a long narration,
+# and background pre-rendering only gets slots nobody else wants.
+PRIORITY_INTRO = 0
+PRIORITY_SHORT = 1
+PRIORITY_LONG = 2
+PRIORITY_BACKGROUND = 3
+
+
+class TTSQueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"TTS queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TTSScheduler:
+    """
+    Caps the number of concurrent edge_tts syntheses. Callers beyond the
+    limit wait in a bounded priority queue; when that is full they are
+    rejected immediately with TTSQueueFullError instead of piling up.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._running = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def _retry_after(self) -> int:
+        if not self.completed:
+            return settings.TTS_RETRY_AFTER_SECONDS
+        avg_run = self.run_time_total / self.completed
+        return max(1, math.ceil(avg_run * len(self._waiters) / self.concurrency))
+
+    async def _acquire(self, priority: int):
+        if self._running < self.concurrency and not self._waiters:
+            self._running += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise TTSQueueFullError(self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on
+                self._release()
+            elif entry in self._waiters:
+                # _release may already have popped it (it skips done futures)
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # Slot goes straight to the next waiter
+                return
+        self._running -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_SHORT):
+        queued_at = time.monotonic()
+        await self._acquire(priority)
+        started_at = time.monotonic()
+        queue_time = started_at - queued_at
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        try:
+            yield
+        finally:
+            run_time = time.monotonic() - started_at
+            self.completed += 1
+            self.run_time_total += run_time
+            self.run_time_max = max(self.run_time_max, run_time)
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(1000 * self.queue_time_total / self.completed, 1) if self.completed else 0.0,
+            "max_queue_ms": round(1000 * self.queue_time_max, 1),
+            "avg_run_ms": round(1000 * self.run_time_total / self.completed, 1) if self.completed else 0.0,
+            "max_run_ms": round(1000 * self.run_time_max, 1),
+        }
+
+
+tts_scheduler = TTSScheduler(settings.TTS_CONCURRENCY, settings.TTS_QUEUE_SIZE)
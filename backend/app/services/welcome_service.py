@@ -0,0 +1,96 @@
+import time
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, run_write
+from app.models import all_models
+from app.services.ai_service import ai_service
+
+
+class WelcomeService:
+    """
+    Persistent cache of Gemini welcome messages per (place name, language).
+    The intro endpoint only calls the model on a miss or after the TTL, and
+    only serves FALLBACK_DATA when neither the cache nor the model has an answer.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def _lookup(self, db: AsyncSession, place_name: str, lang: str) -> Optional[str]:
+        result = await db.execute(
+            select(all_models.WelcomeMessage.text, all_models.WelcomeMessage.created_at).where(
+                all_models.WelcomeMessage.place_name == place_name,
+                all_models.WelcomeMessage.lang == lang,
+            )
+        )
+        row = result.first()
+        if row and row.text and time.time() - (row.created_at or 0) < self.ttl_seconds:
+            return row.text
+        return None
+
+    @staticmethod
+    def _store(db: Session, place_name: str, lang: str, text: str):
+        row = db.execute(
+            select(all_models.WelcomeMessage).where(
+                all_models.WelcomeMessage.place_name == place_name,
+                all_models.WelcomeMessage.lang == lang,
+            )
+        ).scalars().first()
+        if not row:
+            row = all_models.WelcomeMessage(place_name=place_name, lang=lang)
+            db.add(row)
+        row.text = text
+        row.created_at = time.time()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same message first
+            db.rollback()
+
+    async def get_message(self, place_name: str, lang: str = 'en', fallback: Optional[str] = None) -> str:
+        """
+        `fallback` replaces FALLBACK_DATA when the model has no answer,
+        e.g. a place description already translated into `lang`.
+        The lookup uses its own short session, so no connection is held
+        while Gemini answers.
+        """
+        async with AsyncSessionLocal() as db:
+            text = await self._lookup(db, place_name, lang)
+        if text:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = await ai_service.generate_welcome_message(place_name, lang)
+        if text:
+            await run_write(self._store, place_name, lang, text)
+            return text
+        return fallback or ai_service.fallback_welcome_message(place_name)
+
+    def invalidate(self, db: Session, place_names: Optional[Iterable[str]] = None) -> int:
+        """
+        Drops cached messages for the given places (all places if None).
+        """
+        query = db.query(all_models.WelcomeMessage)
+        if place_names is not None:
+            query = query.filter(all_models.WelcomeMessage.place_name.in_(list(place_names)))
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+welcome_service = WelcomeService(settings.WELCOME_CACHE_TTL_HOURS * 3600)
@@ -6,12 +6,15 @@ import { TopBar } from "@/components/ui/TopBar";
 import { Button } from "@/components/ui/Button";
 import { Card } from "@/components/ui/Card";
 import { useTranslation } from "@/lib/i18n/LanguageContext";
-import { getPlaceByLocation, Place } from "@/lib/api";
+import { openProximitySession, Place, ProximitySession } from "@/lib/api";
 import { chatWithAI, speakText, getPlaceAudio, getPlaceIntro, API_URL } from "@/lib/api";
 
 type ScanState = 'INIT' | 'SCANNING' | 'LOCATING' | 'SUCCESS' | 'ERROR';
 type AudioState = 'IDLE' | 'PREPARING' | 'PLAYING' | 'PAUSED' | 'ERROR';
 
+// Without an 'enter' this long after the first GPS fix, no place is nearby
+const NO_MATCH_TIMEOUT_MS = 4000;
+
 // Declare Web Speech API types
 interface Window {
     webkitSpeechRecognition: any;
@@ -247,6 +250,10 @@ function CameraPageContent({ onRetry }: { onRetry: () => void }) {
     useEffect(() => {
         let stream: MediaStream | null = null;
         let timeouts: NodeJS.Timeout[] = [];
+        let proximity: ProximitySession | null = null;
+        let watchId: number | null = null;
+        let matchedPlaceId: number | null = null;
+        let noMatchShown = false;
 
         const startCamera = async () => {
             try {
@@ -283,32 +290,49 @@ function CameraPageContent({ onRetry }: { onRetry: () => void }) {
                 handleNoMatch();
                 return;
             }
-            navigator.geolocation.getCurrentPosition(async (pos) => {
-                setCurrentPos({ latitude: pos.coords.latitude, longitude: pos.coords.longitude });
-                try {
-                    const place = await getPlaceByLocation(pos.coords.latitude, pos.coords.longitude);
+            const showNoMatch = () => {
+                if (matchedPlaceId !== null || noMatchShown) return;
+                noMatchShown = true;
+                // Instead of generic ERROR, use smart NO_MATCH (General Guide Mode)
+                handleNoMatch();
+            };
 
-                    // Immediate feedback once found
-                    setResult(place);
+            // One WebSocket for the whole visit: the server only answers when we enter or leave a place
+            proximity = openProximitySession((event) => {
+                if (event.event === 'enter' && event.place && event.place.id !== matchedPlaceId) {
+                    matchedPlaceId = event.place.id;
+                    // Immediate feedback once found, and again when walking up to the next monument
+                    setResult(event.place);
                     setScanState('SUCCESS');
                     // Play Dynamic Intro instead of standard audio
-                    playIntro(place.id);
+                    playIntro(event.place.id);
+                } else if (event.event === 'error') {
+                    console.error("Proximity error", event.detail);
+                }
+                // 'exit' keeps the last place on screen until the next one is entered
+            });
 
-                } catch (err: any) {
-                    console.error("Scan Error", err);
-                    // Instead of generic ERROR, use smart NO_MATCH (General Guide Mode)
-                    handleNoMatch();
+            let firstFix = true;
+            watchId = navigator.geolocation.watchPosition((pos) => {
+                setCurrentPos({ latitude: pos.coords.latitude, longitude: pos.coords.longitude });
+                proximity?.sendPosition(pos.coords.latitude, pos.coords.longitude);
+                if (firstFix) {
+                    firstFix = false;
+                    // The first fix is answered at once if we are at a place
+                    timeouts.push(setTimeout(showNoMatch, NO_MATCH_TIMEOUT_MS));
                 }
             }, (err) => {
                 // Location error triggers fallback too
                 console.error("Location error", err);
-                handleNoMatch();
+                showNoMatch();
             }, { enableHighAccuracy: true, timeout: 10000 });
         }, 1800));
 
         return () => {
             if (stream) stream.getTracks().forEach(t => t.stop());
             timeouts.forEach(clearTimeout);
+            if (watchId !== null) navigator.geolocation.clearWatch(watchId);
+            proximity?.close();
         };
     }, []);
 
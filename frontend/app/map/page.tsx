@@ -12,19 +12,19 @@ const InteractiveMap = dynamic(() => import('@/components/ui/Map'), {
         <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-emerald-600"></div>
     </div>
 });
-import { fetchPlaces, Place } from "@/lib/api";
+import { fetchPlaces, PlaceSummary } from "@/lib/api";
 import { useTranslation } from "@/lib/i18n/LanguageContext";
 
 export default function MapPage() {
     const router = useRouter();
     const { t } = useTranslation();
-    const [places, setPlaces] = useState<Place[]>([]);
+    const [places, setPlaces] = useState<PlaceSummary[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const fetchPlacesData = async () => {
             try {
-                const data = await fetchPlaces();
+                const data = await fetchPlaces('summary');
                 setPlaces(data);
             } catch (error) {
                 console.error("Failed to fetch places", error);
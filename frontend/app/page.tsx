@@ -9,17 +9,17 @@ import { PricingSection } from "@/components/ui/PricingSection";
 import { SocialProof } from "@/components/ui/SocialProof";
 import { LanguageSelector } from "@/components/ui/LanguageSelector";
 import { useTranslation } from "@/lib/i18n/LanguageContext";
-import { fetchPlaces, Place } from "@/lib/api";
+import { fetchPlaces, PlaceSummary } from "@/lib/api";
 import OnboardingTutorial from "@/components/ui/OnboardingTutorial";
 
 export default function Home() {
     const { t } = useTranslation();
-    const [places, setPlaces] = useState<Place[]>([]);
+    const [places, setPlaces] = useState<PlaceSummary[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         // Fetch only places for the homepage as per new requirements
-        fetchPlaces()
+        fetchPlaces('summary')
             .then(data => {
                 // Take first 4 places for homepage
                 setPlaces(data.slice(0, 4));
@@ -157,7 +157,7 @@ export default function Home() {
                                     </div>
                                     <div className="p-3 flex flex-col flex-1">
                                         <h3 className="font-bold text-slate-800 text-sm leading-tight mb-1 line-clamp-2">{place.name}</h3>
-                                        <p className="text-slate-500 text-[10px] line-clamp-2 mb-2 flex-1">{place.short_desc || place.description}</p>
+                                        <p className="text-slate-500 text-[10px] line-clamp-2 mb-2 flex-1">{place.short_desc}</p>
                                         <div className="flex items-center text-slate-400 text-[10px] font-bold mt-auto">
                                             <Clock size={10} className="mr-1" /> 5 min
                                         </div>
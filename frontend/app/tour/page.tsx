@@ -7,16 +7,16 @@ import { TopBar } from "@/components/ui/TopBar";
 import { Button } from "@/components/ui/Button";
 import { Card } from "@/components/ui/Card";
 import { useTranslation } from "@/lib/i18n/LanguageContext";
-import { fetchPlaces, Place } from "@/lib/api";
+import { fetchPlaces, PlaceSummary } from "@/lib/api";
 
 export default function TourPage() {
     const { t } = useTranslation();
     const [playing, setPlaying] = useState<string | null>(null);
-    const [places, setPlaces] = useState<Place[]>([]);
+    const [places, setPlaces] = useState<PlaceSummary[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        fetchPlaces()
+        fetchPlaces('summary')
             .then(data => {
                 setPlaces(data);
                 setLoading(false);
@@ -79,7 +79,7 @@ export default function TourPage() {
                                                 5:00 {/* Placeholder duration */}
                                             </div>
                                         </div>
-                                        <p className="text-slate-300 text-xs mt-2 line-clamp-1 opacity-80">{place.short_desc || place.description}</p>
+                                        <p className="text-slate-300 text-xs mt-2 line-clamp-1 opacity-80">{place.short_desc}</p>
                                     </div>
                                     <Button
                                         onClick={(e) => togglePlay(e, place.id.toString())}
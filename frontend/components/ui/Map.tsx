@@ -2,7 +2,7 @@
 // Force rebuild
 
 import { useEffect, useState } from 'react';
-import { Place } from '@/lib/api'; // Ensure this import path is correct
+import { PlaceSummary } from '@/lib/api'; // Ensure this import path is correct
 // Leaflet CSS must be imported globally or here
 // Leaflet CSS must be imported globally or here
 import 'leaflet/dist/leaflet.css';
@@ -15,7 +15,7 @@ const Marker = dynamic(() => import('react-leaflet').then(mod => mod.Marker), {
 const Popup = dynamic(() => import('react-leaflet').then(mod => mod.Popup), { ssr: false });
 
 interface MapProps {
-    places: Place[];
+    places: PlaceSummary[];
 }
 
 export default function InteractiveMap({ places }: MapProps) {
@@ -15,6 +15,18 @@ export interface Place {
     type: string;
 }
 
+// What /places?view=summary returns: enough for map pins and list cards
+export interface PlaceSummary {
+    id: number;
+    name: string;
+    short_desc?: string;
+    location_lat: number;
+    location_lng: number;
+    photo_url?: string;
+    type: string;
+    parent_id?: number;
+}
+
 export interface Shop {
     id: number;
     name: string;
@@ -55,8 +67,11 @@ export async function fetchPlace(id: string): Promise<Place> {
     return res.json();
 }
 
-export async function fetchPlaces(): Promise<Place[]> {
-    const res = await fetch(`${API_URL}/places`);
+export async function fetchPlaces(view: 'summary'): Promise<PlaceSummary[]>;
+export async function fetchPlaces(view?: 'full'): Promise<Place[]>;
+export async function fetchPlaces(view: 'summary' | 'full' = 'full'): Promise<PlaceSummary[] | Place[]> {
+    // 'summary' leaves out long texts and boundary polygons (map/list views)
+    const res = await fetch(`${API_URL}/places?view=${view}`);
     if (!res.ok) throw new Error('Failed to fetch places');
     return res.json();
 }
@@ -89,6 +104,48 @@ export async function getPlaceByLocation(lat: number, lng: number): Promise<Plac
     }
 }
 
+export interface ProximityEvent {
+    event: 'enter' | 'exit' | 'error';
+    place_id?: number;
+    place_name?: string;
+    distance_m?: number | null;
+    place?: Place;
+    detail?: string;
+}
+
+export interface ProximitySession {
+    sendPosition: (lat: number, lng: number) => void;
+    close: () => void;
+}
+
+// Streams positions over one WebSocket instead of a by-location request per fix.
+// The server only answers with enter/exit events (with hysteresis and dwell time).
+export function openProximitySession(onEvent: (event: ProximityEvent) => void): ProximitySession {
+    const wsUrl = API_URL.replace(/^http/, 'ws') + '/places/proximity';
+    const socket = new WebSocket(wsUrl);
+    const queued: string[] = [];
+
+    socket.onopen = () => {
+        queued.splice(0).forEach(msg => socket.send(msg));
+    };
+    socket.onmessage = (msg) => {
+        try {
+            onEvent(JSON.parse(msg.data));
+        } catch (err) {
+            console.error("Bad proximity event", err);
+        }
+    };
+
+    return {
+        sendPosition: (lat: number, lng: number) => {
+            const msg = JSON.stringify({ lat, lng, timestamp: Date.now() / 1000 });
+            if (socket.readyState === WebSocket.OPEN) socket.send(msg);
+            else if (socket.readyState === WebSocket.CONNECTING) queued.push(msg);
+        },
+        close: () => socket.close(),
+    };
+}
+
 export async function fetchHotels(): Promise<Hotel[]> {
     const res = await fetch(`${API_URL}/hotels`);
     if (!res.ok) throw new Error('Failed to fetch hotels');
@@ -128,6 +185,47 @@ export async function chatWithAI(query: string, context: string, lang: string):
     return res.json();
 }
 
+export interface ChatStreamEvent {
+    event: 'token' | 'audio' | 'done';
+    data: { text?: string; index?: number; audio_base64?: string; content_type?: string; response?: string };
+}
+
+// Server-Sent Events from /chat/stream: tokens as they are generated, optional per-sentence audio, then 'done'.
+export async function streamChatWithAI(
+    query: string,
+    context: string,
+    lang: string,
+    onEvent: (event: ChatStreamEvent) => void,
+    audio: boolean = false
+): Promise<void> {
+    const res = await fetch(`${API_URL}/chat/stream?audio=${audio}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ query, context, lang })
+    });
+    if (!res.ok || !res.body) throw new Error('Chat failed');
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const eventLine = block.split('\n').find(line => line.startsWith('event: '));
+            const dataLine = block.split('\n').find(line => line.startsWith('data: '));
+            if (eventLine && dataLine) {
+                onEvent({ event: eventLine.slice(7) as ChatStreamEvent['event'], data: JSON.parse(dataLine.slice(6)) });
+            }
+        }
+    }
+}
+
 export interface AudioResponse {
     audio_base64: string;
     content_type: string;
@@ -156,6 +254,10 @@ export const getPlaceIntro = async (placeId: number, lang: string = 'en'): Promi
     return res.json();
 };
 
+// URL for streamed audio/mpeg playback; point an <audio> element at it so playback starts on the first chunk.
+export const getPlaceAudioStreamUrl = (placeId: number, lang: string = 'en', mode: 'short' | 'long' = 'short'): string =>
+    `${API_URL}/places/${placeId}/audio?lang=${lang}&mode=${mode}&stream=true`;
+
 export interface TranslationResponse {
     original: string;
     translated: string;
@@ -170,3 +272,14 @@ export async function translateText(text: string, sourceLang: string, targetLang
     if (!res.ok) throw new Error("Translation failed");
     return res.json();
 }
+
+export async function translateBatch(texts: string[], sourceLang: string, targetLang: string): Promise<TranslationResponse[]> {
+    const res = await fetch(`${API_URL}/translate/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ texts, source_lang: sourceLang, target_lang: targetLang })
+    });
+    if (!res.ok) throw new Error("Translation failed");
+    const data = await res.json();
+    return data.translations;
+}